@@ -25,6 +25,8 @@ setuptools.setup(
     entry_points={
         'console_scripts': [
             'solana-extract-batch = src.extract.ExtractBatch:main',
+            'solana-train-dictionary = src.extract.ExtractBatch:train_dictionary',
+            'solana-extract-sharded = src.extract.ExtractSharded:main',
             'solana-extract-streaming = src.extract.ExtractStreaming:main',
             'solana-load-file = src.load.FileOutput:main'
         ]
@@ -38,6 +40,10 @@ setuptools.setup(
         'neo4j==4.4.1',
         'numpy==1.22.0',
         'pandas==1.3.5',
-        'solana==0.19.0'
-    ]
+        'requests==2.26.0',
+        'websockets==10.1'
+    ],
+    extras_require={
+        'zstd': ['zstandard==0.16.0']
+    }
 )
\ No newline at end of file
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from src.extract.BlockWriter import BlockWriter
+from src.extract.Codec import Codec
+from src.extract.Segment import Segment
+
+
+class Archive:
+    """
+    Write blocks in the batch layout, either a compressed file per slot in a directory per slots_per_dir or a segment
+    per slots_per_dir. Blocks are encoded and compressed in the background by a pool of writers.
+
+    @author zuyezheng
+    """
+
+    path: Path
+    slots_per_dir: int
+    # write blocks to a segment per slots_per_dir instead of a file per slot
+    segments: bool
+    codec: Codec
+    # threads to encode and compress blocks with in the background, 0 to do so in line
+    writers: int
+
+    _segment: Optional[Segment]
+    _writer: Optional[BlockWriter]
+
+    def __init__(
+        self,
+        path: Path,
+        slots_per_dir: int,
+        segments: bool = False,
+        codec: Optional[Codec] = None,
+        writers: int = 1
+    ):
+        self.path = path
+        self.slots_per_dir = slots_per_dir
+        self.segments = segments
+        self.codec = Codec() if codec is None else codec
+        self.writers = writers
+
+        self._segment = None
+        self._writer = None
+
+        # keep the dictionary with the archive so it can be read back
+        self.codec.save_dictionary(self.path)
+
+    def _encode_and_compress(self, slot: int, block: Dict | bytes) -> bytes:
+        return self.codec.compress(block if isinstance(block, bytes) else json.dumps(block).encode('utf-8'))
+
+    def write(self, slot: int, block: Dict | bytes):
+        """ Write a block response that is either parsed or raw bytes, waiting if the writers are behind. """
+        if self.writers == 0:
+            self._write(slot, self._encode_and_compress(slot, block))
+        else:
+            if self._writer is None:
+                self._writer = BlockWriter(self._write, self._encode_and_compress, self.writers, self.writers * 16)
+
+            self._writer.submit(slot, block)
+
+    @property
+    def depths(self) -> Tuple[int, int]:
+        """ Blocks being compressed and those waiting to be written. """
+        return (0, 0) if self._writer is None else self._writer.depths
+
+    def _write(self, slot: int, compressed: bytes):
+        if self.segments:
+            self._append_to_segment(slot, compressed)
+            return
+
+        # create subdirectories for each chunk of blocks
+        path_loc = self.path.joinpath(str(slot // self.slots_per_dir * self.slots_per_dir))
+        path_loc.mkdir(parents=True, exist_ok=True)
+        path_loc.joinpath(f'{slot}{self.codec.suffix}').write_bytes(compressed)
+
+    def _append_to_segment(self, slot: int, compressed: bytes):
+        segment_path = Segment.path_for(self.path, slot, self.slots_per_dir)
+
+        # keep the current segment open, only switching when moving onto the next range of slots or a retry
+        if self._segment is None or self._segment.path != segment_path:
+            self._close_segment()
+            self._segment = Segment(segment_path, self.codec)
+
+        self._segment.append_compressed(slot, compressed)
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def flush(self):
+        """ Wait for all blocks to be written. """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        # flush pending writes before closing the segment they're written to
+        try:
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            self._writer = None
+            self._close_segment()
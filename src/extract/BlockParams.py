@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterable
+
+
+class TransactionDetails(Enum):
+    """ Levels of transaction detail getBlock can return from least to most. """
+
+    NONE = ('none', 0)
+    SIGNATURES = ('signatures', 1)
+    ACCOUNTS = ('accounts', 2)
+    FULL = ('full', 3)
+
+    param: str
+    level: int
+
+    def __init__(self, param: str, level: int):
+        self.param = param
+        self.level = level
+
+
+@dataclass(frozen=True)
+class BlockParams:
+    """
+    Parts of a block needed from getBlock so only those are requested.
+
+    @author zuyezheng
+    """
+
+    transaction_details: TransactionDetails = TransactionDetails.FULL
+    rewards: bool = True
+
+    @staticmethod
+    def combine(all_params: Iterable[BlockParams]) -> BlockParams:
+        """ Minimum params that satisfy everything needed by all params. """
+        all_params = list(all_params)
+        if len(all_params) == 0:
+            return BlockParams()
+
+        return BlockParams(
+            max((p.transaction_details for p in all_params), key=lambda d: d.level),
+            any(p.rewards for p in all_params)
+        )
+
+    def config(self) -> Dict[str, any]:
+        """ Entries for the getBlock config, leaving out defaults. """
+        config = {}
+        if self.transaction_details != TransactionDetails.FULL:
+            config['transactionDetails'] = self.transaction_details.param
+        if not self.rewards:
+            config['rewards'] = False
+
+        return config
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+
+class BlockWriter:
+    """
+    Encode blocks on a pool of workers, such as compressing or transforming them, and write them in the order submitted
+    from a background thread so fetching, encoding and disk writes overlap. Submitting waits once too many blocks are
+    pending so a slow disk pushes back on extract instead of buffering without bound.
+
+    @author zuyezheng
+    """
+
+    write: Callable[[int, any], None]
+    # encode a block given its slot and the block
+    encode: Callable[[int, any], any]
+
+    _executor: Executor
+    # encodings in submission order, None once closed
+    _pending: queue.Queue[Optional[Tuple[int, Future]]]
+    _thread: threading.Thread
+    _error: Optional[Exception]
+
+    def __init__(
+        self,
+        write: Callable[[int, any], None],
+        encode: Callable[[int, any], any],
+        workers: int = 1,
+        max_pending: int = 64,
+        executor: Optional[Executor] = None
+    ):
+        """ Encode with a pool of worker threads unless given an executor such as a process pool to own. """
+        self.write = write
+        self.encode = encode
+
+        self._executor = ThreadPoolExecutor(max_workers=workers) if executor is None else executor
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._error = None
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            pending = self._pending.get()
+            if pending is None:
+                self._pending.task_done()
+                return
+
+            # keep draining after an error so submit doesn't block forever
+            if self._error is None:
+                slot, encoded = pending
+                try:
+                    self.write(slot, encoded.result())
+                except Exception as e:
+                    self._error = e
+
+            self._pending.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    @property
+    def depths(self) -> Tuple[int, int]:
+        """ Pending blocks still being encoded and those encoded and waiting to be written. """
+        with self._pending.mutex:
+            futures = [pending[1] for pending in self._pending.queue if pending is not None]
+
+        encoding = sum(1 for future in futures if not future.done())
+        return encoding, len(futures) - encoding
+
+    def submit(self, slot: int, block: any):
+        """ Queue a block to be encoded and written, blocking while the writer is behind. """
+        self._raise_error()
+        self._pending.put((slot, self._executor.submit(self.encode, slot, block)))
+
+    def flush(self):
+        """ Wait for all pending blocks to be written, raising if any failed. """
+        self._pending.join()
+        self._raise_error()
+
+    def close(self):
+        """ Flush all pending blocks, raising if any failed to write. """
+        self._pending.put(None)
+        self._thread.join()
+        self._executor.shutdown()
+
+        self._raise_error()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import gzip
+import threading
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class Compression(Enum):
+    """ Compression formats for archived blocks with their file suffix and the magic bytes starting each frame. """
+
+    GZIP = ('.gz', b'\x1f\x8b')
+    ZSTD = ('.zst', b'\x28\xb5\x2f\xfd')
+
+    suffix: str
+    magic: bytes
+
+    def __init__(self, suffix: str, magic: bytes):
+        self.suffix = suffix
+        self.magic = magic
+
+    @staticmethod
+    def of(data: bytes) -> Compression:
+        for compression in Compression:
+            if data.startswith(compression.magic):
+                return compression
+
+        raise ValueError('Unknown compression format.')
+
+
+class Codec:
+    """
+    Compress blocks with gzip or zstd with an optional dictionary trained on a sample of blocks, decompressing either
+    based on the frame so archives can be read without knowing how they were written.
+
+    Dictionaries are saved to the root of the archive by id so readers can find the dictionary for any zstd frame
+    when first needed.
+
+    @author zuyezheng
+    """
+
+    DICTIONARY_SUFFIX = '.zdict'
+    # default dictionary size recommended by zstd
+    DICTIONARY_SIZE = 112_640
+
+    compression: Compression
+    level: Optional[int]
+    # dictionary to compress with
+    dictionary: Optional[bytes]
+
+    # dictionaries to decompress with by id and directories to look for others in
+    _dictionaries: Dict[int, bytes]
+    _dictionary_dirs: List[Path]
+    # zstd contexts aren't thread safe
+    _local: threading.local
+
+    @staticmethod
+    def train(samples: Iterable[bytes], size: int = DICTIONARY_SIZE) -> bytes:
+        """ Train a zstd dictionary from sample blocks. """
+        Codec._require_zstd()
+        return zstandard.train_dictionary(size, list(samples)).as_bytes()
+
+    @staticmethod
+    def dictionary_id(dictionary: bytes) -> int:
+        Codec._require_zstd()
+        return zstandard.ZstdCompressionDict(dictionary).dict_id()
+
+    @staticmethod
+    def for_archive(path: Path) -> Codec:
+        """ Codec to read an archive with dictionaries saved in its root. """
+        codec = Codec()
+        codec._dictionary_dirs = [path]
+
+        return codec
+
+    @staticmethod
+    def for_block(path: Path) -> Codec:
+        """ Codec to read a block file or segment, the archive root is either its directory or the one above. """
+        codec = Codec()
+        codec._dictionary_dirs = [path.parent, path.parent.parent]
+
+        return codec
+
+    @staticmethod
+    def _require_zstd():
+        if zstandard is None:
+            raise ImportError('zstandard is required for zstd compression, install with solana-etl[zstd].')
+
+    def __init__(
+        self,
+        compression: Compression = Compression.GZIP,
+        level: Optional[int] = None,
+        dictionary_path: Optional[Path] = None
+    ):
+        if compression == Compression.ZSTD:
+            Codec._require_zstd()
+
+        self.compression = compression
+        self.level = level
+        self.dictionary = None
+
+        self._dictionaries = {}
+        self._dictionary_dirs = []
+        self._local = threading.local()
+
+        if dictionary_path is not None:
+            self.dictionary = dictionary_path.read_bytes()
+            self.add_dictionary(self.dictionary)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def suffix(self) -> str:
+        """ Suffix of block files. """
+        return f'.json{self.compression.suffix}'
+
+    def add_dictionary(self, dictionary: bytes):
+        self._dictionaries[Codec.dictionary_id(dictionary)] = dictionary
+
+    def _find_dictionary(self, dictionary_id: int) -> bytes:
+        if dictionary_id not in self._dictionaries:
+            for dictionary_dir in self._dictionary_dirs:
+                dictionary_path = dictionary_dir.joinpath(f'{dictionary_id}{Codec.DICTIONARY_SUFFIX}')
+                if dictionary_path.exists():
+                    self._dictionaries[dictionary_id] = dictionary_path.read_bytes()
+                    break
+            else:
+                raise ValueError(f'Missing dictionary {dictionary_id}.')
+
+        return self._dictionaries[dictionary_id]
+
+    def save_dictionary(self, path: Path):
+        """ Save the dictionary to the root of an archive so it can be read back. """
+        if self.dictionary is not None:
+            path.mkdir(parents=True, exist_ok=True)
+            path.joinpath(f'{Codec.dictionary_id(self.dictionary)}{Codec.DICTIONARY_SUFFIX}') \
+                .write_bytes(self.dictionary)
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        if not hasattr(self._local, 'compressor'):
+            dictionary = None if self.dictionary is None else zstandard.ZstdCompressionDict(self.dictionary)
+            self._local.compressor = zstandard.ZstdCompressor(
+                level=3 if self.level is None else self.level, dict_data=dictionary
+            )
+
+        return self._local.compressor
+
+    def _decompressor(self, dictionary_id: int) -> zstandard.ZstdDecompressor:
+        if not hasattr(self._local, 'decompressors'):
+            self._local.decompressors = {}
+
+        decompressor = self._local.decompressors.get(dictionary_id)
+        if decompressor is None:
+            if dictionary_id == 0:
+                decompressor = zstandard.ZstdDecompressor()
+            else:
+                decompressor = zstandard.ZstdDecompressor(
+                    dict_data=zstandard.ZstdCompressionDict(self._find_dictionary(dictionary_id))
+                )
+
+            self._local.decompressors[dictionary_id] = decompressor
+
+        return decompressor
+
+    def compress(self, data: bytes) -> bytes:
+        if self.compression == Compression.ZSTD:
+            return self._compressor().compress(data)
+
+        return gzip.compress(data, 9 if self.level is None else self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        if Compression.of(data) == Compression.ZSTD:
+            Codec._require_zstd()
+            return self._decompressor(zstandard.get_frame_parameters(data).dict_id).decompress(data)
+
+        return gzip.decompress(data)
+
+    def read(self, path: Path) -> bytes:
+        """ Read and decompress a block file. """
+        return self.decompress(path.read_bytes())
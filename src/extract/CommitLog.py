@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+
+@dataclass
+class Commit:
+    # inclusive ranges of slots with all of their output in files
+    slots: List[List[int]]
+    # names of files written for the slots relative to the output
+    files: List[str]
+    # names of files merged into files to be removed once they're in place
+    replaced: List[str] = field(default_factory=list)
+
+    @staticmethod
+    def of(slots: Iterable[int], files: List[str]) -> Commit:
+        ranges = []
+        for slot in sorted(slots):
+            if len(ranges) > 0 and ranges[-1][1] + 1 >= slot:
+                ranges[-1][1] = max(ranges[-1][1], slot)
+            else:
+                ranges.append([slot, slot])
+
+        return Commit(ranges, files)
+
+
+class CommitLog:
+    """
+    Append only log of commits tying ranges of slots to the output files written for them. A commit is durable once
+    its line is synced to the log, files staged for it are moved into place after so a crash part way through can be
+    rolled forward from the last commit on restart.
+
+    @author zuyezheng
+    """
+
+    # bytes read from the end of the log at a time looking for the last commit
+    READ_SIZE = 64 * 1024
+
+    path: Path
+
+    def __init__(self, path: Path):
+        self.path = path.joinpath('commits.jsonl')
+        self._truncate_partial()
+
+    def _truncate_partial(self):
+        """ Drop a partial line left by a crash while appending since that commit never happened. """
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - self.READ_SIZE)
+                f.seek(start)
+                chunk = f.read(end - start)
+
+                newline = chunk.rfind(b'\n')
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+
+            if end < size:
+                f.truncate(end)
+
+    def commits(self) -> List[Commit]:
+        if not self.path.exists():
+            return []
+
+        with open(self.path) as f:
+            return [Commit(**json.loads(line)) for line in f]
+
+    def last(self) -> Optional[Commit]:
+        """ Last commit without reading the whole log. """
+        if not self.path.exists():
+            return None
+
+        with open(self.path, 'rb') as f:
+            end = f.seek(0, os.SEEK_END)
+            # skip the newline ending the last commit
+            tail = b''
+            start = end
+            while start > 0 and tail.rfind(b'\n', 0, len(tail) - 1) < 0:
+                start = max(0, start - self.READ_SIZE)
+                f.seek(start)
+                tail = f.read(end - start)
+
+        lines = tail.rstrip(b'\n').rsplit(b'\n', 1)
+        return None if len(lines[-1]) == 0 else Commit(**json.loads(lines[-1]))
+
+    def append(self, commit: Commit):
+        """ Durably append the commit, once returned its files can be moved into place. """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(asdict(commit)) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
@@ -1,11 +1,23 @@
+from __future__ import annotations
+
 import itertools
+import json
+import threading
 import time
 from abc import abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Iterator, Tuple, List, Optional
 
-from solana.rpc.api import Client
+from src.extract.BlockParams import BlockParams
+from src.extract.JsonRpc import JsonRpc
+from src.extract.Manifest import Manifest
+from src.extract.RetryQueue import RetryQueue
+from src.extract.RpcPool import RpcPool
+from src.extract.SlotTracker import SlotTracker
 
 
 class BlockException(Exception):
@@ -18,18 +30,27 @@ class BlockException(Exception):
         if self.error_json['code'] == -32004:
             # block not yet available, should wait for it
             return True
+        if self.error_json['code'] == JsonRpc.MISSING_CODE:
+            # dropped from a batch response by the node so might be there next time
+            return True
 
         return False
 
+    def is_skipped(self):
+        # slot was skipped so there will never be a block
+        return self.error_json['code'] == -32007
+
 
 @dataclass
 class TimedResponse:
     response: any
     call_time: float
     total_time: float = -1
+    # exception if the call failed
+    error: Optional[Exception] = None
 
     def with_total(self, total: float):
-        return TimedResponse(self.response, self.call_time, total)
+        return TimedResponse(self.response, self.call_time, total, self.error)
 
 
 class Extract:
@@ -39,12 +60,66 @@ class Extract:
     @author zuyezheng
     """
 
-    def __init__(self, endpoint: str, output_loc: str, slots_per_dir: int):
-        self.endpoint = endpoint
+    # sidecar of slots without blocks
+    SKIPPED_SLOTS = 'skipped_slots.txt'
+    # number of slots to enumerate confirmed blocks for at a time
+    SLOTS_PER_ENUMERATE = 1_000
+    # seconds to wait on the tip to reach the next slot when caught up
+    TIP_WAIT = 1
+    # seconds between flushing output and checkpointing completed slots
+    CHECKPOINT_INTERVAL = 10
+
+    # if blocks are fetched and processed as raw response bytes instead of being parsed
+    raw: bool = False
+    # parts of blocks to request, everything by default
+    block_params: BlockParams = BlockParams()
+
+    def __init__(
+        self,
+        endpoints: str | List[str],
+        output_loc: str,
+        slots_per_dir: int,
+        concurrency: int = 1,
+        batch_size: int = 1,
+        rate_limit: Optional[float] = None,
+        max_rate_limit: Optional[float] = None,
+        commitment: Optional[str] = None,
+        websocket_endpoint: Optional[str] = None
+    ):
+        self.endpoints = [endpoints] if isinstance(endpoints, str) else list(endpoints)
         self.output_path = Path(output_loc)
         self.slots_per_dir = slots_per_dir
+        # number of block requests to keep in flight
+        self.concurrency = max(concurrency, 1)
+        # number of blocks to request in a single JSON-RPC batch
+        self.batch_size = max(batch_size, 1)
+        # commitment of blocks to fetch, None for the RPC default of finalized
+        self.commitment = commitment
+        # websocket to follow the tip with when extracting without an end, defaults to one for the first endpoint
+        self.websocket_endpoint = SlotTracker.websocket_for(self.endpoints[0]) \
+            if websocket_endpoint is None else websocket_endpoint
+
+        # each endpoint has a rate limiter shared by all fetchers, starting at rate limit requests per second or
+        # unlimited until throttled
+        self._pool = RpcPool(self.endpoints, rate_limit, max_rate_limit)
+        self._retries = RetryQueue(self.output_path)
+        # slots completed by previous runs are skipped
+        self._manifest = Manifest(self.output_path, slots_per_dir)
+        # block requests in flight
+        self._fetching = deque()
+        # set to abandon extract without checkpointing again
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def execute(call) -> TimedResponse:
+        """ Execute call once, timing it and capturing any exception instead of raising. """
+        start = time.perf_counter()
+        try:
+            response = TimedResponse(call(), time.perf_counter() - start)
+        except Exception as e:
+            response = TimedResponse(None, -1, error=e)
 
-        self._client = Client(endpoint)
+        return response.with_total(time.perf_counter() - start)
 
     def execute_with_backoff(
         self,
@@ -55,77 +130,314 @@ class Extract:
         # wait will be doubled each time until max is exceeded
         max_duration: int = 60
     ) -> TimedResponse:
+        """ Execute call and wait to retry if it fails, only used for cheap calls since it blocks the caller. """
         start = time.perf_counter()
-        response = TimedResponse(None, -1)
 
-        try:
-            call_start = time.perf_counter()
-            call_response = call()
-            response = TimedResponse(call_response, time.perf_counter() - call_start)
-        except Exception as e:
+        while True:
+            response = self.execute(call)
+            if response.error is None:
+                break
+
             retryable = True
-            if isinstance(e, BlockException):
-                retryable = e.should_retry()
+            if isinstance(response.error, BlockException):
+                retryable = response.error.should_retry()
 
             if retryable and wait_duration <= max_duration:
-                print(f'Waiting {wait_duration} seconds: "{e}".')
+                print(f'Waiting {wait_duration} seconds: "{response.error}".')
 
                 time.sleep(wait_duration)
-                response = self.execute_with_backoff(call, wait_duration * 2, max_duration)
+                wait_duration *= 2
             else:
-                print(f'Max wait exceeded: "{e}".')
+                print(f'Max wait exceeded: "{response.error}".')
+                break
 
         return response.with_total(time.perf_counter() - start)
 
-    def get_block(self, slot: int):
-        block = self._client.get_block(slot, 'jsonParsed')
+    def commitment_config(self) -> List[Dict[str, any]]:
+        """ Optional config param for requests taking a commitment. """
+        return [] if self.commitment is None else [{'commitment': self.commitment}]
+
+    def block_config(self) -> Dict[str, any]:
+        """ Config param for getBlock requests. """
+        config = {'encoding': 'jsonParsed', **self.block_params.config()}
+        if self.commitment is not None:
+            config['commitment'] = self.commitment
+
+        return config
+
+    def get_block(self, slot: int) -> Dict | bytes:
+        if self.raw:
+            body = self._pool.call(lambda endpoint: endpoint.rpc.request_raw('getBlock', slot, self.block_config()))
+            error = JsonRpc.raw_error(body)
+            if error is not None:
+                raise BlockException(error)
+
+            return body
+
+        block = self._pool.call(lambda endpoint: endpoint.rpc.request('getBlock', slot, self.block_config()))
         if 'error' in block:
             raise BlockException(block['error'])
 
         return block
 
-    def start(self, start: int, end: int):
-        def get_slots():
-            if end is None:
-                return itertools.count(start)
-            elif end < start:
-                return range(start, end - 1, -1)
+    def get_blocks(self, slots: List[int]) -> Dict[int, Dict | bytes | BlockException]:
+        """
+        Get blocks for all slots in a single batch request, mapping each block or error back to its slot. Batch
+        responses can't be split without decoding so raw blocks are re-encoded.
+        """
+        calls = [('getBlock', (slot, self.block_config())) for slot in slots]
+        responses = self._pool.call(lambda endpoint: endpoint.rpc.batch(calls), len(slots))
+
+        return {
+            slot: BlockException(block['error']) if 'error' in block else
+            json.dumps(block).encode('utf-8') if self.raw else block
+            for slot, block in zip(slots, responses)
+        }
+
+    def get_confirmed_slots(self, start: int, end: int) -> List[int]:
+        """ Slots between start and end inclusive that have confirmed blocks, in ascending order. """
+        return self._pool.call(
+            lambda endpoint: endpoint.rpc.result('getBlocks', start, end, *self.commitment_config())
+        )
+
+    def get_slot(self) -> int:
+        """ Latest slot at the commitment. """
+        return self._pool.call(lambda endpoint: endpoint.rpc.result('getSlot', *self.commitment_config()))
+
+    def record_skipped(self, skipped: Iterable[int]):
+        """ Append skipped slots to a sidecar file so they're accounted for without being fetched. """
+        # resuming a partially completed chunk enumerates its skipped slots again, those were already recorded
+        skipped = sorted(slot for slot in skipped if slot not in self._manifest)
+        # skipped slots are done as far as the manifest is concerned
+        for slot in skipped:
+            self._manifest.add(slot)
+
+        if len(skipped) > 0:
+            self.output_path.mkdir(parents=True, exist_ok=True)
+            with open(self.output_path.joinpath(Extract.SKIPPED_SLOTS), 'a') as f:
+                f.writelines(f'{slot}\n' for slot in skipped)
+
+    def slots(self, start: int, end: Optional[int]) -> Iterator[int]:
+        """
+        Slots with confirmed blocks from start to end, counting down if end is less than start and continuing
+        indefinitely if end is None. Slots are enumerated in chunks and any skipped are recorded.
+
+        Without an end, the tip is followed with a slot subscription so blocks are fetched as soon as they reach the
+        commitment instead of polling.
+        """
+        if start is None:
+            return
+        elif end is None:
+            slot = start
+            commitment = 'finalized' if self.commitment is None else self.commitment
+            with SlotTracker(self.websocket_endpoint, self.get_slot, commitment) as tracker:
+                while True:
+                    tip = tracker.wait_for(slot, self.TIP_WAIT)
+                    if tip is None or tip < slot:
+                        continue
+
+                    confirmed = self.execute_with_backoff(
+                        partial(self.get_confirmed_slots, slot, min(tip, slot + self.SLOTS_PER_ENUMERATE - 1))
+                    ).response
+
+                    if not confirmed:
+                        # the tip can be slightly ahead of blocks at the commitment, wait for the next slot
+                        tracker.wait_for(tip + 1, self.TIP_WAIT)
+                        continue
+
+                    # slots after the last confirmed could still be produced so only those before are known skipped
+                    self.record_skipped(set(range(slot, confirmed[-1] + 1)).difference(confirmed))
+                    yield from confirmed
+
+                    slot = confirmed[-1] + 1
+        else:
+            low = min(start, end)
+            high = max(start, end)
+
+            chunk_starts = range(low, high + 1, self.SLOTS_PER_ENUMERATE)
+            for chunk_start in (reversed(chunk_starts) if end < start else chunk_starts):
+                chunk_slots = range(chunk_start, min(chunk_start + self.SLOTS_PER_ENUMERATE - 1, high) + 1)
+                if self._manifest.covers(chunk_slots.start, chunk_slots.stop - 1):
+                    continue
+
+                confirmed = self.execute_with_backoff(
+                    partial(self.get_confirmed_slots, chunk_slots.start, chunk_slots.stop - 1)
+                ).response
+                if confirmed is None:
+                    # fall back to fetching every slot if unable to enumerate
+                    confirmed = list(chunk_slots)
+                else:
+                    # end could be past the tip so only slots before the last confirmed are known skipped, fetch the
+                    # rest to retry until they're produced
+                    last = confirmed[-1] if len(confirmed) > 0 else chunk_slots.start - 1
+                    self.record_skipped(set(range(chunk_slots.start, last + 1)).difference(confirmed))
+                    confirmed = list(confirmed) + list(range(last + 1, chunk_slots.stop))
+
+                yield from (reversed(confirmed) if end < start else confirmed)
+
+    def fetch_batch(self, slots: List[int]) -> List[Tuple[int, TimedResponse]]:
+        """ Fetch blocks for a batch of slots in the same order, each with the error if it failed. """
+        if len(slots) == 1:
+            return [(slots[0], self.execute(partial(self.get_block, slots[0])))]
+
+        timed_response = self.execute(partial(self.get_blocks, slots))
+        if timed_response.error is not None:
+            return [(slot, timed_response) for slot in slots]
+
+        # attribute an even share of the batch time to each slot
+        call_time = timed_response.call_time / len(slots)
+        total_time = timed_response.total_time / len(slots)
+
+        responses = []
+        for slot in slots:
+            block = timed_response.response[slot]
+            if isinstance(block, BlockException):
+                responses.append((slot, TimedResponse(None, -1, total_time, block)))
             else:
-                return range(start, end + 1)
+                responses.append((slot, TimedResponse(block, call_time, total_time)))
+
+        return responses
+
+    def handle_error(self, slot: int, error: Exception):
+        """ Record a failed slot as skipped, queue it for retry, or dead letter it if it will never succeed. """
+        if isinstance(error, BlockException) and error.is_skipped():
+            self._retries.succeeded(slot)
+            self.record_skipped([slot])
+        elif isinstance(error, BlockException) and not error.should_retry():
+            self._retries.dead_letter(slot, error)
+        else:
+            self._retries.failed(slot, error)
+
+    def fetch(self, slots: Iterable[int]) -> Iterator[Tuple[int, TimedResponse]]:
+        """
+        Fetch blocks for the given slots in batches with up to concurrency requests in flight, yielding responses in
+        the same order as the slots. Failed slots are queued to be retried in the background and yielded once they
+        succeed, interleaved with newer slots.
+        """
+        # slots waiting on a retry will be fetched by the retry and those already completed can be skipped
+        slots = filter(lambda s: s not in self._retries and s not in self._manifest, slots)
+        batches = iter(lambda: list(itertools.islice(slots, self.batch_size)), [])
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = self._fetching = deque()
+
+            def submit_due():
+                due = self._retries.due()
+                for i in range(0, len(due), self.batch_size):
+                    in_flight.append(executor.submit(self.fetch_batch, due[i:i + self.batch_size]))
+
+            def complete_oldest():
+                for slot, timed_response in in_flight.popleft().result():
+                    if timed_response.error is None:
+                        self._retries.succeeded(slot)
+                        yield slot, timed_response
+                    else:
+                        self.handle_error(slot, timed_response.error)
+
+                self._retries.save()
+
+            try:
+                for batch in batches:
+                    submit_due()
+                    in_flight.append(executor.submit(self.fetch_batch, batch))
+
+                    # wait on the oldest requests once the window is full
+                    while len(in_flight) >= self.concurrency:
+                        yield from complete_oldest()
+
+                # out of new slots, finish what's in flight and wait on any remaining retries
+                while True:
+                    submit_due()
+
+                    if in_flight:
+                        yield from complete_oldest()
+                    else:
+                        wait = self._retries.next_due()
+                        if wait is None:
+                            break
+
+                        time.sleep(wait)
+            finally:
+                self._retries.save(True)
+
+    def start(self, start: Optional[int], end: Optional[int], replay_dead_letters: bool = False):
+        """
+        Extract blocks from start to end along with any retries left from previous runs. Optionally replay slots that
+        previously exhausted their retries.
+        """
+        if replay_dead_letters:
+            self._retries.replay_dead_letters()
 
         num_blocks = 0
         call_time = 0
         call_time_with_wait = 0
         process_time = 0
+        last_checkpoint = time.monotonic()
+
+        try:
+            for slot, timed_response in self.fetch(self.slots(start, end)):
+                if self._stopped.is_set():
+                    return
 
-        for slot in get_slots():
-            timed_response = self.execute_with_backoff(lambda: self.get_block(slot))
-            if timed_response.response is None:
-                print(f'Error fetching info for slot {slot}.')
-            else:
                 call_time += timed_response.call_time
                 call_time_with_wait += timed_response.total_time
 
-                start = time.perf_counter()
+                process_start = time.perf_counter()
                 self.process_block(slot, timed_response.response)
-                process_time += time.perf_counter() - start
+                self._manifest.add(slot)
+                if time.monotonic() - last_checkpoint >= self.CHECKPOINT_INTERVAL:
+                    self.checkpoint()
+                    last_checkpoint = time.monotonic()
+                process_time += time.perf_counter() - process_start
 
                 num_blocks += 1
 
-            if num_blocks % 60 == 0:
-                print(f'Extracted {num_blocks} blocks ending on {slot} with average times: '
-                      f'call: {call_time/num_blocks:.2f}s, '
-                      f'call with wait: {call_time_with_wait/num_blocks:.2f}s, '
-                      f'process: {process_time/num_blocks:.2f}s.')
-
-                num_blocks = 0
-                call_time = 0
-                call_time_with_wait = 0
-                process_time = 0
-
+                if num_blocks % 60 == 0:
+                    print(f'Extracted {num_blocks} blocks ending on {slot} with average times: '
+                          f'call: {call_time/num_blocks:.2f}s, '
+                          f'call with wait: {call_time_with_wait/num_blocks:.2f}s, '
+                          f'process: {process_time/num_blocks:.2f}s, queues: {self.queue_depths()}, '
+                          f'endpoints:\n{self._pool}')
+
+                    num_blocks = 0
+                    call_time = 0
+                    call_time_with_wait = 0
+                    process_time = 0
+
+            if not self._stopped.is_set():
+                self.checkpoint(final=True)
+        finally:
+            self.close()
+
+    def stop(self):
+        """
+        Abandon extract from any thread, start returns after the block being processed without checkpointing again so
+        anything since the last checkpoint is left for whoever resumes.
+        """
+        self._stopped.set()
 
     @abstractmethod
-    def process_block(self, slot: int, block_json: Dict):
+    def process_block(self, slot: int, block_json: Dict | bytes):
         raise NotImplemented
 
+    def queue_depths(self) -> Dict[str, int]:
+        """ Blocks waiting in each stage to see which is limiting throughput. """
+        return {'fetch': len(self._fetching)}
+
+    def checkpoint(self, final: bool = False):
+        """
+        Flush output and save completed slots so a restart can resume from here, final once extract has finished.
+        Stopping with an error doesn't checkpoint since output for the last slot could be partially written.
+        """
+        self.flush()
+        self._manifest.save()
+
+    def flush(self):
+        """ Called before checkpointing to make sure output for all processed blocks has been written. """
+        pass
+
+    def close(self):
+        """ Called once extract has finished or stopped to flush and close any output. """
+        pass
+
 
@@ -1,9 +1,14 @@
-import gzip
-import json
-from argparse import ArgumentParser
-from typing import Dict
+from __future__ import annotations
 
+import random
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from src.extract.Archive import Archive
+from src.extract.Codec import Codec, Compression
 from src.extract.Extract import Extract
+from src.extract.Segment import Segment
 
 
 class ExtractBatch(Extract):
@@ -13,14 +18,152 @@ class ExtractBatch(Extract):
     @author zuyezheng
     """
 
-    def process_block(self, slot: int, block_json: Dict):
-        # create subdirectories for each chunk of blocks
-        path_loc = self.output_path.joinpath(str(slot // self.slots_per_dir * self.slots_per_dir))
-        path_loc.mkdir(parents=True, exist_ok=True)
-        path_loc = path_loc.joinpath(f'{slot}.json.gz')
+    archive: Archive
+
+    @staticmethod
+    def add_arguments(parser: ArgumentParser):
+        """ Add arguments to configure extract other than output and the range of slots. """
+        parser.add_argument(
+            '--endpoint',
+            type=str,
+            nargs='+',
+            help='RPC endpoints to use, requests are routed to the one with the best recent latency and errors.',
+            default=['https://api.mainnet-beta.solana.com']
+        )
+        parser.add_argument(
+            '--websocket',
+            type=str,
+            help='Websocket endpoint to follow the tip with when there is no end, defaults to one for the first '
+                 'endpoint.',
+            default=None
+        )
+        parser.add_argument(
+            '--commitment',
+            type=str,
+            help='Commitment of blocks to extract, confirmed or finalized, defaults to finalized.',
+            default=None
+        )
+        parser.add_argument(
+            '--slots_per_dir',  type=int, help='Number of slots to stream to the same file.', default=10_000
+        )
+        parser.add_argument(
+            '--concurrency', type=int, help='Number of block requests to keep in flight.', default=1
+        )
+        parser.add_argument(
+            '--batch_size', type=int, help='Number of blocks to request in a single JSON-RPC batch.', default=1
+        )
+        parser.add_argument(
+            '--rate_limit',
+            type=float,
+            help='Requests per second to start at, adjusted with latency and errors, if None unlimited until '
+                 'throttled.',
+            default=None
+        )
+        parser.add_argument(
+            '--max_rate_limit', type=float, help='Max requests per second the rate limit can grow to.', default=None
+        )
+        parser.add_argument(
+            '--raw',
+            help='Archive the raw response bytes without parsing and re-encoding blocks.',
+            action='store_true'
+        )
+        parser.add_argument(
+            '--segments',
+            help='Write blocks to an indexed segment file per slots_per_dir instead of a file per slot.',
+            action='store_true'
+        )
+        parser.add_argument(
+            '--writers',
+            type=int,
+            help='Number of threads compressing blocks in the background, 0 to compress and write in line.',
+            default=1
+        )
+        parser.add_argument(
+            '--compression', type=str, help='Compression of archived blocks, gzip or zstd.', default='gzip'
+        )
+        parser.add_argument(
+            '--compression_level',
+            type=int,
+            help='Compression level, defaults to 9 for gzip and 3 for zstd.',
+            default=None
+        )
+        parser.add_argument(
+            '--dictionary', type=str, help='Path to a zstd dictionary to compress blocks with.', default=None
+        )
+
+    @staticmethod
+    def from_args(output_loc: str, args: Namespace) -> ExtractBatch:
+        """ Create from parsed arguments added with add_arguments. """
+        return ExtractBatch(
+            args.endpoint,
+            output_loc,
+            args.slots_per_dir,
+            args.concurrency,
+            args.batch_size,
+            args.rate_limit,
+            args.max_rate_limit,
+            args.segments,
+            args.raw,
+            Compression[args.compression.upper()],
+            args.compression_level,
+            None if args.dictionary is None else Path(args.dictionary),
+            args.writers,
+            args.commitment,
+            args.websocket
+        )
+
+    def __init__(
+        self,
+        endpoints: Union[str, List[str]],
+        output_loc: str,
+        slots_per_dir: int,
+        concurrency: int = 1,
+        batch_size: int = 1,
+        rate_limit: Optional[float] = None,
+        max_rate_limit: Optional[float] = None,
+        segments: bool = False,
+        raw: bool = False,
+        compression: Compression = Compression.GZIP,
+        compression_level: Optional[int] = None,
+        dictionary_path: Optional[Path] = None,
+        writers: int = 1,
+        commitment: Optional[str] = None,
+        websocket_endpoint: Optional[str] = None
+    ):
+        super().__init__(
+            endpoints,
+            output_loc,
+            slots_per_dir,
+            concurrency,
+            batch_size,
+            rate_limit,
+            max_rate_limit,
+            commitment,
+            websocket_endpoint
+        )
+
+        # skip parsing responses and archive the raw bytes as is
+        self.raw = raw
+        self.archive = Archive(
+            self.output_path,
+            slots_per_dir,
+            segments,
+            Codec(compression, compression_level, dictionary_path),
+            writers
+        )
 
-        with gzip.open(path_loc, 'w') as f:
-            f.write(json.dumps(block_json).encode('utf-8'))
+    def process_block(self, slot: int, block_json: Dict | bytes):
+        self.archive.write(slot, block_json)
+
+    def queue_depths(self) -> Dict[str, int]:
+        compressing, writing = self.archive.depths
+        return {**super().queue_depths(), 'compress': compressing, 'write': writing}
+
+    def flush(self):
+        self.archive.flush()
+
+    def close(self):
+        self.archive.close()
 
 
 def main():
@@ -29,9 +172,6 @@ def main():
     parser.add_argument(
         'output_loc', type=str, help='Directory to dump block responses.'
     )
-    parser.add_argument(
-        '--endpoint', type=str, help='Which network to use.', default='https://api.mainnet-beta.solana.com'
-    )
     parser.add_argument(
         '--start', type=int, help='Slot to start extract.'
     )
@@ -42,13 +182,50 @@ def main():
         default=None
     )
     parser.add_argument(
-        '--slots_per_dir',  type=int, help='Number of slots to stream to the same file.', default=10_000
+        '--replay_dead_letters',
+        help='Retry slots that previously exhausted their retries, start can be omitted to only replay.',
+        action='store_true'
     )
+    ExtractBatch.add_arguments(parser)
 
     args = parser.parse_args()
 
-    extract = ExtractBatch(args.endpoint, args.output_loc, args.slots_per_dir)
-    extract.start(args.start, args.end)
+    extract = ExtractBatch.from_args(args.output_loc, args)
+    extract.start(args.start, args.end, args.replay_dead_letters)
+
+
+def train_dictionary():
+    parser = ArgumentParser(description='Train a zstd dictionary on a sample of archived blocks.')
+
+    parser.add_argument('blocks_dir', type=str, help='Directory of archived blocks to sample.')
+    parser.add_argument('dictionary', type=str, help='Where to write the dictionary.')
+    parser.add_argument('--samples', type=int, help='Number of blocks to sample.', default=1_000)
+    parser.add_argument('--size', type=int, help='Size of the dictionary in bytes.', default=Codec.DICTIONARY_SIZE)
+
+    args = parser.parse_args()
+
+    blocks_path = Path(args.blocks_dir)
+    codec = Codec.for_archive(blocks_path)
+
+    # sample from block files or segments
+    sources = [
+        (path, None) for path in blocks_path.rglob('*.json.*')
+        if path.suffix in {compression.suffix for compression in Compression}
+    ]
+    for segment_path in Segment.find(blocks_path):
+        sources.extend((segment_path, slot) for slot in Segment(segment_path).slots())
+
+    samples = []
+    segments = {}
+    for path, slot in random.sample(sources, min(args.samples, len(sources))):
+        if slot is None:
+            samples.append(codec.read(path))
+        else:
+            if path not in segments:
+                segments[path] = Segment(path, codec)
+            samples.append(segments[path].read(slot))
+
+    Path(args.dictionary).write_bytes(Codec.train(samples, args.size))
 
 
 if __name__ == '__main__':
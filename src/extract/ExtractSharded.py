@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from src.extract.Codec import Codec
+from src.extract.Extract import Extract
+from src.extract.ExtractBatch import ExtractBatch
+from src.extract.RetryQueue import RetryQueue
+from src.extract.Segment import Segment
+
+
+class ExtractSharded:
+    """
+    Extract a range of slots as shards aligned to slots_per_dir, run by a pool of processes on any number of hosts
+    sharing the same manifest directory. Shards are claimed with files in the manifest directory, each extracted with
+    its own progress and retry state, then moved into the usual slots_per_dir layout of the output once complete.
+
+    Claims are kept alive with a heartbeat so shards claimed by a worker that died can be taken over once stale. Each
+    claim holds a token of its owner, a worker that finds its claim taken over or gone abandons the shard without
+    touching the claim of the new owner. Workers keep going until every shard is done, waiting on shards claimed by
+    others so none are left behind by a worker that died.
+
+    Slots that exhausted their retries in a shard are appended to the dead letters of the output once the shard is
+    merged, where they can be replayed by ExtractBatch with --replay_dead_letters.
+
+    @author zuyezheng
+    """
+
+    CLAIM_SUFFIX = '.claim'
+    DONE_SUFFIX = '.done'
+    # seconds between touching claims and without a touch before a claim can be taken over
+    HEARTBEAT = 30
+    STALE_CLAIM = 300
+
+    manifest_path: Path
+    output_path: Path
+    slots_per_shard: int
+    processes: int
+    # arguments to create ExtractBatch for each shard with
+    extract_args: Namespace
+
+    def __init__(
+        self,
+        manifest_dir: str,
+        output_loc: str,
+        extract_args: Namespace,
+        slots_per_shard: int = None,
+        processes: int = 1
+    ):
+        self.manifest_path = Path(manifest_dir)
+        self.output_path = Path(output_loc)
+        self.extract_args = extract_args
+        self.slots_per_shard = extract_args.slots_per_dir if slots_per_shard is None else slots_per_shard
+        self.processes = max(processes, 1)
+
+        # shards need to be aligned so each can be merged without touching another's chunks
+        if self.slots_per_shard % extract_args.slots_per_dir != 0:
+            raise ValueError('Slots per shard must be a multiple of slots per dir.')
+
+    def shards(self, start: int, end: int) -> List[range]:
+        """ Shards covering start to end inclusive in the order they should be extracted. """
+        low = min(start, end)
+        high = max(start, end)
+
+        shards = []
+        for shard_start in range(low // self.slots_per_shard * self.slots_per_shard, high + 1, self.slots_per_shard):
+            shards.append(range(max(shard_start, low), min(shard_start + self.slots_per_shard - 1, high) + 1))
+
+        return list(reversed(shards)) if end < start else shards
+
+    def _shard_path(self, shard: range, suffix: str = '') -> Path:
+        return self.manifest_path.joinpath(f'{shard.start}_{shard.stop - 1}{suffix}')
+
+    def claim(self, shard: range) -> Optional[str]:
+        """ Try to claim a shard, taking over any stale claim, returning the token of the claim if claimed. """
+        claim_path = self._shard_path(shard, self.CLAIM_SUFFIX)
+        token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+
+        try:
+            fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            stale_path = claim_path.with_name(f'{claim_path.name}.stale.{token}')
+            try:
+                stale = claim_path.stat()
+                if time.time() - stale.st_mtime < self.STALE_CLAIM:
+                    return None
+                stale_token = claim_path.read_text()
+
+                # only one worker can move the stale claim out of the way
+                os.rename(claim_path, stale_path)
+            except FileNotFoundError:
+                return None
+
+            # another worker could have taken over the same stale claim first, put back a fresh claim moved instead
+            if stale_path.read_text() != stale_token or stale_path.stat().st_mtime != stale.st_mtime:
+                try:
+                    os.link(stale_path, claim_path)
+                except FileExistsError:
+                    pass
+                stale_path.unlink()
+                return None
+
+            return self.claim(shard)
+
+        with os.fdopen(fd, 'w') as f:
+            f.write(token)
+
+        return token
+
+    @staticmethod
+    def owns(claim_path: Path, token: str) -> bool:
+        """ If the claim still belongs to the owner of token. """
+        try:
+            return claim_path.read_text() == token
+        except FileNotFoundError:
+            return False
+
+    def _heartbeat(self, claim_path: Path, token: str, done: threading.Event, extract: ExtractBatch):
+        """ Touch the claim while it's owned, stopping extract if it was taken over or removed. """
+        while not done.wait(self.HEARTBEAT):
+            try:
+                if ExtractSharded.owns(claim_path, token):
+                    os.utime(claim_path)
+                    continue
+            except FileNotFoundError:
+                pass
+
+            print(f'Lost claim {claim_path.name}, abandoning shard.')
+            extract.stop()
+            return
+
+    def _merge(self, work_path: Path):
+        """
+        Move blocks extracted by a shard into the output along with its dead letters and skipped slots, leaving its
+        progress and retry state behind.
+        """
+        self.output_path.mkdir(parents=True, exist_ok=True)
+
+        for path in work_path.iterdir():
+            destination = self.output_path.joinpath(path.name)
+
+            if path.is_dir():
+                # chunks are only written by a single shard unless output from another extract overlaps
+                if destination.exists():
+                    for block_path in path.iterdir():
+                        shutil.move(str(block_path), str(destination.joinpath(block_path.name)))
+                    path.rmdir()
+                else:
+                    shutil.move(str(path), str(destination))
+            elif path.suffix in {Segment.SUFFIX, Segment.INDEX_SUFFIX, Codec.DICTIONARY_SUFFIX}:
+                shutil.move(str(path), str(destination))
+
+        # make dead letters and skipped slots visible in the output instead of leaving them with the shard
+        for name in [RetryQueue.DEAD_LETTERS, Extract.SKIPPED_SLOTS]:
+            sidecar_path = work_path.joinpath(name)
+            if sidecar_path.exists():
+                with open(sidecar_path) as source, open(self.output_path.joinpath(name), 'a') as f:
+                    shutil.copyfileobj(source, f)
+                sidecar_path.unlink()
+
+    def extract_shard(self, shard: range, ascending: bool, token: str) -> bool:
+        """ Extract and merge a shard claimed with token, returning False if it was abandoned after losing the claim. """
+        work_path = self._shard_path(shard)
+        claim_path = self._shard_path(shard, self.CLAIM_SUFFIX)
+
+        extract = ExtractBatch.from_args(str(work_path), self.extract_args)
+
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(claim_path, token, done, extract), daemon=True).start()
+
+        try:
+            print(f'Extracting shard {shard.start} to {shard.stop - 1}.')
+
+            if ascending:
+                extract.start(shard.start, shard.stop - 1)
+            else:
+                extract.start(shard.stop - 1, shard.start)
+        finally:
+            done.set()
+
+        # the claim could have been taken over at any point, leave the shard and claim to the new owner
+        if not ExtractSharded.owns(claim_path, token):
+            print(f'Abandoned shard {shard.start} to {shard.stop - 1}.')
+            return False
+
+        self._merge(work_path)
+        self._shard_path(shard, self.DONE_SUFFIX).touch()
+        claim_path.unlink()
+
+        print(f'Finished shard {shard.start} to {shard.stop - 1}.')
+        return True
+
+    def work(self, start: int, end: int) -> int:
+        """
+        Claim and extract shards until all of them are done, returning the number extracted. Shards claimed by others
+        are checked again after each heartbeat so they're taken over if their worker died.
+        """
+        extracted = 0
+        while True:
+            unfinished = 0
+            for shard in self.shards(start, end):
+                if self._shard_path(shard, self.DONE_SUFFIX).exists():
+                    continue
+
+                token = self.claim(shard)
+                if token is not None and self.extract_shard(shard, start <= end, token):
+                    extracted += 1
+                else:
+                    unfinished += 1
+
+            if unfinished == 0:
+                return extracted
+
+            print(f'Waiting on {unfinished} shards claimed by other workers.')
+            time.sleep(self.HEARTBEAT)
+
+    def start(self, start: int, end: int) -> int:
+        """ Extract all shards between start and end with a pool of processes, returning the number extracted. """
+        self.manifest_path.mkdir(parents=True, exist_ok=True)
+
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            workers = [executor.submit(self.work, start, end) for _ in range(self.processes)]
+            return sum(worker.result() for worker in workers)
+
+
+def main():
+    parser = ArgumentParser(description='Extract solana blocks from rpc in shards across processes and hosts.')
+
+    parser.add_argument(
+        'output_loc', type=str, help='Directory to dump block responses.'
+    )
+    parser.add_argument(
+        '--manifest_dir',
+        type=str,
+        help='Directory shared by all workers to claim shards and keep their progress in.',
+        required=True
+    )
+    parser.add_argument('--start', type=int, help='Slot to start extract.', required=True)
+    parser.add_argument(
+        '--end', type=int, help='Slot to end extract, if less than start count down from start.', required=True
+    )
+    parser.add_argument(
+        '--slots_per_shard',
+        type=int,
+        help='Number of slots in each shard, a multiple of slots_per_dir and defaults to it.',
+        default=None
+    )
+    parser.add_argument('--processes', type=int, help='Number of processes extracting shards.', default=1)
+    ExtractBatch.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    ExtractSharded(args.manifest_dir, args.output_loc, args, args.slots_per_shard, args.processes) \
+        .start(args.start, args.end)
+
+
+if __name__ == '__main__':
+    main()
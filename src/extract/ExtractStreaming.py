@@ -1,48 +1,251 @@
-from argparse import ArgumentParser
-from typing import Set, Dict
+from __future__ import annotations
 
-from pandas import DataFrame
+import json
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Set, Dict, Optional, Union, List, Tuple
 
+from src.extract.Archive import Archive
+from src.extract.BlockWriter import BlockWriter
+from src.extract.Codec import Codec, Compression
+from src.extract.CommitLog import Commit, CommitLog
 from src.extract.Extract import Extract
-from src.load.TransformTask import TransformTask
+from src.load.CsvWriter import CsvWriter
+from src.load.FileOutput import FileOutputFormat
+from src.load.ParquetWriter import ParquetWriter
+from src.load.RollingWriter import RollingWriter
+from src.load.TransformTask import TransformTask, ERROR_META
 from src.transform.Block import Block
 
+# rows transformed from a block as the name of the output, its columns with types and the rows
+Outputs = List[Tuple[str, List[Tuple[str, str]], List[List[any]]]]
+
 
 class ExtractStreaming(Extract):
     """
-    Extract blocks and stream them directly through transforms and to file.
+    Extract blocks and stream them directly through transforms and to file, optionally also archiving each block in
+    the batch layout from the same response so it can be transformed again later without another fetch.
+
+    Rows are written to rolling CSV or Parquet parts per task for each slots_per_dir. Parts are staged and committed by
+    logging the slots they cover before moving them into place, so output is never torn and a restart resumes exactly
+    from the last commit. Commits happen every commit_interval, when a part rolls over on size, once a slots_per_dir is
+    finished and when extract finishes. Small parts from frequent commits are merged once their slots_per_dir is
+    finished or extract finishes, so each output usually ends up with a single part per slots_per_dir. Completed slots
+    are only saved along with a commit.
+
+    With transform processes, blocks are parsed and transformed in a pool of processes while rows are written in slot
+    order from a background thread so fetching, transforms and writes run as separate stages.
 
     @author zuyezheng
     """
 
     tasks: Set[TransformTask]
+    output_format: FileOutputFormat
+    archive: Optional[Archive]
+    # processes to transform blocks with, 0 to transform in line
+    transform_processes: int
+    # seconds between commits when parts haven't rolled over
+    commit_interval: float
+
+    _writer: RollingWriter
+    _transformer: Optional[BlockWriter]
+    _commits: CommitLog
+    # slots processed since the last commit
+    _uncommitted: List[int]
+    _last_commit: float
+    # chunk of the last processed slot and paths written since parts were last merged
+    _chunk: Optional[int]
+    _written: Set[Path]
 
-    def __init__(self, endpoint: str, output_loc: str, slots_per_dir: int, tasks: Set[TransformTask]):
-        super().__init__(endpoint, output_loc, slots_per_dir)
+    def __init__(
+        self,
+        endpoints: Union[str, List[str]],
+        output_loc: str,
+        slots_per_dir: int,
+        tasks: Set[TransformTask],
+        concurrency: int = 1,
+        batch_size: int = 1,
+        rate_limit: Optional[float] = None,
+        max_rate_limit: Optional[float] = None,
+        commitment: Optional[str] = None,
+        websocket_endpoint: Optional[str] = None,
+        archive_loc: Optional[str] = None,
+        archive_segments: bool = False,
+        archive_codec: Optional[Codec] = None,
+        archive_writers: int = 1,
+        transform_processes: int = 0,
+        output_format: FileOutputFormat = FileOutputFormat.CSV,
+        commit_interval: float = 10
+    ):
+        super().__init__(
+            endpoints,
+            output_loc,
+            slots_per_dir,
+            concurrency,
+            batch_size,
+            rate_limit,
+            max_rate_limit,
+            commitment,
+            websocket_endpoint
+        )
 
         self.tasks = tasks
+        self.output_format = output_format
+        if archive_loc is None:
+            self.archive = None
+            # only request what's needed by the tasks
+            self.block_params = TransformTask.block_params(tasks)
+        else:
+            # archived blocks need to be complete for whatever is transformed from them later
+            self.archive = Archive(Path(archive_loc), slots_per_dir, archive_segments, archive_codec, archive_writers)
+
+        self.transform_processes = transform_processes
+        # parsing responses is left to the transform processes so only bytes need to be sent to them
+        self.raw = transform_processes > 0
+
+        self.commit_interval = commit_interval
+        self._commits = CommitLog(self.output_path)
+        self._uncommitted = []
+        self._last_commit = time.monotonic()
+        self._chunk = None
+        self._written = set()
+        self._recover_outputs()
+
+        # rows are buffered across blocks and committed at commit_interval or once parts roll over
+        self._writer = CsvWriter() if output_format == FileOutputFormat.CSV else ParquetWriter()
+        self._transformer = None
+
+    def _recover_outputs(self):
+        """
+        Finish moving files of the last commit into place and removing those they replaced along with marking its
+        slots complete in case of a crash part way through, everything else staged was never committed and will be
+        extracted again.
+        """
+        commit = self._commits.last()
+        if commit is not None:
+            for name in commit.files:
+                RollingWriter.commit_staged(self.output_path.joinpath(name))
+            for name in commit.replaced:
+                replaced_path = self.output_path.joinpath(name)
+                if replaced_path.exists():
+                    replaced_path.unlink()
+            for start, end in commit.slots:
+                self._manifest.add_range(start, end)
+
+        RollingWriter.discard_staged(self.output_path)
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths = super().queue_depths()
+        if self._transformer is not None:
+            depths['transform'], depths['write'] = self._transformer.depths
+        if self.archive is not None:
+            depths['archive_compress'], depths['archive_write'] = self.archive.depths
+
+        return depths
+
+    def checkpoint(self, final: bool = False):
+        """
+        Only checkpoint once commit_interval has passed, parts have rolled over or extract has finished. Without a
+        checkpoint completed slots aren't saved either so the manifest never has slots without committed rows.
+        """
+        if final or self._writer.rolled or time.monotonic() - self._last_commit >= self.commit_interval:
+            super().checkpoint(final)
+            if final:
+                self._merge_parts()
+
+    def _merge_parts(self):
+        """ Merge committed parts written since the last merge, committing merged parts like any others. """
+        files, replaced = self._writer.prepare_merge(self._written)
+        self._written = set()
+
+        if len(files) > 0:
+            self._commits.append(Commit([], [f.name for f in files], [r.name for r in replaced]))
+            self._writer.commit()
 
-    def process_block(self, slot: int, block_json: Dict):
-        path_base = self.output_path.joinpath(str(slot // self.slots_per_dir * self.slots_per_dir))
+    def flush(self):
+        # rows are written by the transformer's thread so wait on it before committing them
+        if self._transformer is not None:
+            self._transformer.flush()
+        # slots are only committed once their archived blocks are written
+        if self.archive is not None:
+            self.archive.flush()
 
-        def write_rows(name: str, df: DataFrame):
-            file_path = path_base.with_name(f'{path_base.name}_{name.lower()}.csv')
-            if file_path.exists():
-                df.to_csv(str(file_path), mode='a', index=False, header=False)
-            else:
-                df.to_csv(str(file_path), index=False, header=True)
+        files = self._writer.prepare()
+        if len(files) > 0 or len(self._uncommitted) > 0:
+            self._commits.append(Commit.of(self._uncommitted, [f.name for f in files]))
+            self._writer.commit()
+            self._uncommitted = []
 
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        # anything not committed by a checkpoint is left staged to be discarded on restart
+        try:
+            if self._transformer is not None:
+                self._transformer.close()
+        finally:
+            self._transformer = None
+            try:
+                self._writer.close()
+            finally:
+                if self.archive is not None:
+                    self.archive.close()
+
+    @staticmethod
+    def transform(tasks: Set[TransformTask], slot: int, block_json: Dict | bytes) -> Outputs:
+        """ Transform a block with each task, run in transform processes so everything passed needs to pickle. """
+        outputs = []
         try:
-            block = Block(block_json, str(slot))
+            block = Block(json.loads(block_json) if isinstance(block_json, bytes) else block_json, str(slot))
 
             # aggregate results and errors for each task
-            for task in self.tasks:
-                results_and_errors = task.transform(block)
+            for task in tasks:
+                rows, errors = task.transform(block)
 
-                write_rows(task.name, task.to_df(results_and_errors[0]))
-                write_rows('errors', TransformTask.errors_to_df(results_and_errors[1]))
+                outputs.append((task.name, task.meta, rows))
+                if len(errors) > 0:
+                    outputs.append(('errors', ERROR_META, errors))
         except Exception as e:
-            write_rows('errors', TransformTask.errors_to_df([['process_block', slot, str(e)]]))
+            outputs.append(('errors', ERROR_META, [['process_block', slot, str(e)]]))
+
+        return outputs
+
+    def _write(self, slot: int, outputs: Outputs):
+        chunk = slot // self.slots_per_dir * self.slots_per_dir
+        for name, meta, rows in outputs:
+            name = name.lower()
+            path = self.output_path.joinpath(f'{chunk}_{name}{self._writer.SUFFIX}')
+            self._writer.write(name, path, meta, rows)
+            self._written.add(path)
+
+    def process_block(self, slot: int, block_json: Dict | bytes):
+        # commit a finished chunk before writing any of the next and merge its parts
+        chunk = slot // self.slots_per_dir
+        if chunk != self._chunk:
+            if len(self._uncommitted) > 0:
+                super().checkpoint()
+                self._merge_parts()
+            self._chunk = chunk
+
+        self._uncommitted.append(slot)
+        if self.archive is not None:
+            self.archive.write(slot, block_json)
+
+        if self.transform_processes == 0:
+            self._write(slot, ExtractStreaming.transform(self.tasks, slot, block_json))
+        else:
+            if self._transformer is None:
+                self._transformer = BlockWriter(
+                    self._write,
+                    partial(ExtractStreaming.transform, self.tasks),
+                    max_pending=self.transform_processes * 16,
+                    executor=ProcessPoolExecutor(max_workers=self.transform_processes)
+                )
+
+            self._transformer.submit(slot, block_json)
 
 
 def main():
@@ -53,7 +256,23 @@ def main():
     )
     parser.add_argument('--tasks', nargs='+', help='List of tasks to execute or all.', required=True)
     parser.add_argument(
-        '--endpoint', type=str, help='Which network to use.', default='https://api.mainnet-beta.solana.com'
+        '--endpoint',
+        type=str,
+        nargs='+',
+        help='RPC endpoints to use, requests are routed to the one with the best recent latency and errors.',
+        default=['https://api.mainnet-beta.solana.com']
+    )
+    parser.add_argument(
+        '--websocket',
+        type=str,
+        help='Websocket endpoint to follow the tip with when there is no end, defaults to one for the first endpoint.',
+        default=None
+    )
+    parser.add_argument(
+        '--commitment',
+        type=str,
+        help='Commitment of blocks to extract, confirmed or finalized, defaults to finalized.',
+        default=None
     )
     parser.add_argument(
         '--start', type=int, help='Slot to start extract.'
@@ -67,6 +286,64 @@ def main():
     parser.add_argument(
         '--slots_per_file',  type=int, help='Number of slots to stream to the same file.', default=10_000
     )
+    parser.add_argument(
+        '--concurrency', type=int, help='Number of block requests to keep in flight.', default=1
+    )
+    parser.add_argument(
+        '--batch_size', type=int, help='Number of blocks to request in a single JSON-RPC batch.', default=1
+    )
+    parser.add_argument(
+        '--rate_limit',
+        type=float,
+        help='Requests per second to start at, adjusted with latency and errors, if None unlimited until throttled.',
+        default=None
+    )
+    parser.add_argument(
+        '--max_rate_limit', type=float, help='Max requests per second the rate limit can grow to.', default=None
+    )
+    parser.add_argument(
+        '--replay_dead_letters',
+        help='Retry slots that previously exhausted their retries, start can be omitted to only replay.',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--output_format', type=str, help='File format of streamed rows, csv or parquet.', default='csv'
+    )
+    parser.add_argument(
+        '--commit_interval',
+        type=float,
+        help='Seconds between committing rows, parts of each slots_per_file are merged once it is done.',
+        default=10
+    )
+    parser.add_argument(
+        '--transform_processes',
+        type=int,
+        help='Number of processes to transform blocks in while fetching and writing, 0 to transform in line.',
+        default=0
+    )
+    parser.add_argument(
+        '--archive_loc',
+        type=str,
+        help='Directory to also archive blocks to in the batch layout, fetching full blocks regardless of tasks.',
+        default=None
+    )
+    parser.add_argument(
+        '--archive_segments',
+        help='Archive blocks to an indexed segment file per slots_per_file instead of a file per slot.',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--archive_writers',
+        type=int,
+        help='Number of threads compressing archived blocks in the background, 0 to compress and write in line.',
+        default=1
+    )
+    parser.add_argument(
+        '--archive_compression', type=str, help='Compression of archived blocks, gzip or zstd.', default='gzip'
+    )
+    parser.add_argument(
+        '--archive_dictionary', type=str, help='Path to a zstd dictionary to compress blocks with.', default=None
+    )
 
     args = parser.parse_args()
 
@@ -74,9 +351,25 @@ def main():
         args.endpoint,
         args.output_loc,
         args.slots_per_file,
-        TransformTask.from_names(args.tasks)
+        TransformTask.from_names(args.tasks),
+        args.concurrency,
+        args.batch_size,
+        args.rate_limit,
+        args.max_rate_limit,
+        args.commitment,
+        args.websocket,
+        args.archive_loc,
+        args.archive_segments,
+        Codec(
+            Compression[args.archive_compression.upper()],
+            dictionary_path=None if args.archive_dictionary is None else Path(args.archive_dictionary)
+        ),
+        args.archive_writers,
+        args.transform_processes,
+        FileOutputFormat[args.output_format.upper()],
+        args.commit_interval
     )
-    extract.start(args.start, args.end)
+    extract.start(args.start, args.end, args.replay_dead_letters)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,111 @@
+import itertools
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+
+class JsonRpcException(Exception):
+    """ Request level error from the RPC such as a malformed or unsupported batch. """
+
+    def __init__(self, error_json):
+        self.error_json = error_json
+        super().__init__(f'Error code {self.error_json["code"]}: {self.error_json["message"]}')
+
+
+class JsonRpc:
+    """
+    Minimal JSON-RPC over HTTP client that keeps connections alive and can pack many calls into a single batch request.
+
+    @author zuyezheng
+    """
+
+    # responses smaller than this are fully decoded when checking raw responses for errors
+    RAW_DECODE_SIZE = 4_096
+    # error code for calls missing from or malformed in a batch response, unlike node errors these are worth retrying
+    MISSING_CODE = 'missing'
+
+    endpoint: str
+    timeout: float
+
+    _ids: itertools.count
+    _local: threading.local
+
+    @staticmethod
+    def raw_error(body: bytes) -> Optional[Dict[str, any]]:
+        """
+        Error object of a raw response if there is one. Errors are always small so only those are decoded, larger
+        responses just need the result key near the start.
+        """
+        if len(body) > JsonRpc.RAW_DECODE_SIZE and b'"result"' in body[:256]:
+            return None
+
+        return json.loads(body).get('error')
+
+    def __init__(self, endpoint: str, timeout: float = 10):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+        self._ids = itertools.count(1)
+        # sessions aren't guaranteed to be thread safe so keep one per thread
+        self._local = threading.local()
+
+    @property
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+
+        return self._local.session
+
+    def _post_raw(self, payload: any) -> bytes:
+        response = self._session.post(self.endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+        return response.content
+
+    def _post(self, payload: any) -> any:
+        return json.loads(self._post_raw(payload))
+
+    def request(self, method: str, *params: any) -> Dict[str, any]:
+        """ Make a single call returning the full response which could include an error. """
+        return self._post({'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': list(params)})
+
+    def request_raw(self, method: str, *params: any) -> bytes:
+        """ Make a single call returning the response body without decoding it. """
+        return self._post_raw({'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': list(params)})
+
+    def result(self, method: str, *params: any) -> any:
+        """ Make a single call returning only the result and raising if there was an error. """
+        response = self.request(method, *params)
+        if 'error' in response:
+            raise JsonRpcException(response['error'])
+
+        return response['result']
+
+    def batch(self, calls: List[Tuple[str, Tuple[any, ...]]]) -> List[Dict[str, any]]:
+        """
+        Make a list of calls as tuples of method and params in a single batch request, returning the responses in the
+        same order as the calls. Responses can come back in any order so are mapped back to their calls by id.
+        """
+        ids = [next(self._ids) for _ in calls]
+        responses = self._post([
+            {'jsonrpc': '2.0', 'id': call_id, 'method': method, 'params': list(params)}
+            for call_id, (method, params) in zip(ids, calls)
+        ])
+
+        # a single error object is returned if the batch as a whole was rejected
+        if isinstance(responses, dict):
+            raise JsonRpcException(
+                responses.get('error', {'code': JsonRpc.MISSING_CODE, 'message': 'Invalid batch response.'})
+            )
+
+        responses_by_id = {
+            response.get('id'): response for response in responses
+            if isinstance(response, dict) and ('result' in response or 'error' in response)
+        }
+        return [
+            responses_by_id.get(
+                call_id, {'error': {'code': JsonRpc.MISSING_CODE, 'message': 'Missing from batch response.'}}
+            ) for call_id in ids
+        ]
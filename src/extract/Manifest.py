@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+
+class Manifest:
+    """
+    Persistent record of completed slots as sorted, inclusive ranges per chunk of slots_per_dir so a restarted extract
+    can skip them without touching any output.
+
+    @author zuyezheng
+    """
+
+    path: Path
+    slots_per_dir: int
+
+    _chunks: Dict[int, List[List[int]]]
+    _lock: threading.Lock
+
+    def __init__(self, path: Path, slots_per_dir: int):
+        self.path = path.joinpath('manifest.json')
+        self.slots_per_dir = slots_per_dir
+
+        self._chunks = {}
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            with open(self.path) as f:
+                manifest_json = json.load(f)
+
+            # chunks are only for lookups so add ranges back in case slots_per_dir changed
+            for ranges in manifest_json['chunks'].values():
+                for start, end in ranges:
+                    self.add_range(start, end)
+
+    def __contains__(self, slot: int):
+        ranges = self._chunks.get(self._chunk(slot))
+        if ranges is None:
+            return False
+
+        i = bisect.bisect_right(ranges, [slot, math.inf])
+        return i > 0 and ranges[i - 1][1] >= slot
+
+    def covers(self, start: int, end: int) -> bool:
+        """ If every slot from start to end inclusive has been completed. """
+        while start <= end:
+            chunk = self._chunk(start)
+            chunk_end = min(end, chunk + self.slots_per_dir - 1)
+
+            ranges = self._chunks.get(chunk, [])
+            i = bisect.bisect_right(ranges, [start, math.inf])
+            if i == 0 or ranges[i - 1][1] < chunk_end:
+                return False
+
+            start = chunk_end + 1
+
+        return True
+
+    def __len__(self):
+        """ Number of completed slots. """
+        return sum(end - start + 1 for ranges in self._chunks.values() for start, end in ranges)
+
+    def _chunk(self, slot: int) -> int:
+        return slot // self.slots_per_dir * self.slots_per_dir
+
+    def ranges(self) -> List[List[int]]:
+        """ All completed ranges in slot order, ranges spanning chunks are not merged. """
+        return [r for chunk in sorted(self._chunks) for r in self._chunks[chunk]]
+
+    @staticmethod
+    def _merge(ranges: List[List[int]], start: int, end: int):
+        # replace all ranges overlapping or adjacent to start and end with a single range
+        i = bisect.bisect_right(ranges, [start, math.inf])
+        low = i - 1 if i > 0 and ranges[i - 1][1] >= start - 1 else i
+        high = bisect.bisect_right(ranges, [end + 1, math.inf])
+
+        if low < high:
+            start = min(start, ranges[low][0])
+            end = max(end, ranges[high - 1][1])
+
+        ranges[low:high] = [[start, end]]
+
+    def add(self, slot: int):
+        """ Mark the slot completed, merging it into any adjacent ranges. """
+        self.add_range(slot, slot)
+
+    def add_range(self, start: int, end: int):
+        """ Mark all slots from start to end inclusive completed. """
+        with self._lock:
+            while start <= end:
+                chunk = self._chunk(start)
+                chunk_end = min(end, chunk + self.slots_per_dir - 1)
+                Manifest._merge(self._chunks.setdefault(chunk, []), start, chunk_end)
+
+                start = chunk_end + 1
+
+    def save(self):
+        """ Checkpoint completed slots, only call once everything for the completed slots has been flushed. """
+        with self._lock:
+            manifest_json = {
+                'slots_per_dir': self.slots_per_dir,
+                'chunks': {str(chunk): [list(r) for r in ranges] for chunk, ranges in sorted(self._chunks.items())}
+            }
+
+        # write and rename so a crash never leaves a partial manifest
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f'{self.path.name}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(manifest_json, f)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all fetchers with the rate adjusted AIMD style, additively increased while calls succeed
+    without latency creeping up and multiplicatively decreased on errors, slow calls, or throttling. Throttling pauses
+    all calls for the duration of any Retry-After.
+
+    @author zuyezheng
+    """
+
+    # requests per second, None to not limit until throttled
+    rate: Optional[float]
+    min_rate: float
+    max_rate: Optional[float]
+    # requests per second to increase by for each second of successful calls
+    increase: float
+    # multiple to decrease the rate by on errors or congestion
+    decrease: float
+    # calls slower than this multiple of the best smoothed latency are considered congestion
+    latency_tolerance: float
+
+    _lock: threading.Condition
+    _tokens: float
+    _last_refill: float
+    _paused_until: float
+    _last_decrease: float
+    _latency: Optional[float]
+    _best_latency: Optional[float]
+    # recent acquire times to estimate the rate when throttled without a limit
+    _recent: deque
+
+    @staticmethod
+    def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+        """ Parse Retry-After which can either be in seconds or a HTTP date. """
+        value = headers.get('Retry-After')
+        if value is None:
+            return None
+
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+            except (TypeError, ValueError):
+                return None
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        min_rate: float = 0.5,
+        increase: float = 1,
+        decrease: float = 0.5,
+        latency_tolerance: float = 3
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+
+        self._lock = threading.Condition()
+        self._tokens = 1
+        self._last_refill = time.monotonic()
+        self._paused_until = 0
+        self._last_decrease = 0
+        self._latency = None
+        self._best_latency = None
+        self._recent = deque()
+
+    @property
+    def paused(self) -> bool:
+        """ If calls are paused after being throttled. """
+        return time.monotonic() < self._paused_until
+
+    def acquire(self, tokens: int = 1):
+        """
+        Block until tokens are available. Tokens are taken as soon as any are available, going into debt for large
+        requests such as batches so they don't starve.
+        """
+        with self._lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.rate is None:
+                    self._recent.append(now)
+                    while now - self._recent[0] > 1:
+                        self._recent.popleft()
+
+                    return
+                else:
+                    # refill with a burst of at most a second's worth of tokens
+                    self._tokens = min(self._tokens + (now - self._last_refill) * self.rate, max(self.rate, 1))
+                    self._last_refill = now
+
+                    if self._tokens > 0:
+                        self._tokens -= tokens
+                        return
+
+                    wait = (1 - self._tokens) / self.rate
+
+                self._lock.wait(wait)
+
+    def _decrease(self, now: float):
+        # decrease at most once a second since calls in flight will report the same congestion
+        if now - self._last_decrease < 1:
+            return
+
+        if self.rate is None:
+            # start limiting from what was being sent
+            self.rate = max(len(self._recent), self.min_rate)
+
+        self.rate = max(self.rate * self.decrease, self.min_rate)
+        self._last_decrease = now
+
+    def succeeded(self, latency: float):
+        """ Record a successful call, increasing the rate unless latency suggests the endpoint is congested. """
+        with self._lock:
+            self._latency = latency if self._latency is None else self._latency * 0.9 + latency * 0.1
+            self._best_latency = self._latency if self._best_latency is None else min(self._best_latency, self._latency)
+
+            if self.rate is None:
+                return
+
+            if self._latency > self._best_latency * self.latency_tolerance:
+                self._decrease(time.monotonic())
+            else:
+                self.rate += self.increase / self.rate
+                if self.max_rate is not None:
+                    self.rate = min(self.rate, self.max_rate)
+
+    def failed(self):
+        """ Record a failed call that could have been due to load. """
+        with self._lock:
+            self._decrease(time.monotonic())
+
+    def throttled(self, retry_after: Optional[float] = None):
+        """ Record being throttled, pausing all calls for retry after or a second if not provided. """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + (1 if retry_after is None else retry_after))
+            self._decrease(now)
+
+            self._lock.notify_all()
+
+    def __str__(self):
+        return 'unlimited' if self.rate is None else f'{self.rate:.1f}/s'
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Retry:
+    slot: int
+    # number of failed attempts so far
+    attempts: int
+    # epoch seconds when the slot is due to be retried
+    due: float
+    error: str
+    # if currently being fetched so it isn't handed out twice
+    in_flight: bool = False
+
+
+class RetryQueue:
+    """
+    Persistent queue of slots that failed to fetch, each retried on its own exponential backoff so newer slots can
+    keep flowing. Slots that exhaust their attempts are appended to a dead letter file that can be replayed later.
+
+    @author zuyezheng
+    """
+
+    DEAD_LETTERS = 'dead_letters.txt'
+
+    queue_path: Path
+    dead_letter_path: Path
+
+    # wait before the first retry which is doubled for each subsequent attempt up to the max wait
+    wait_duration: float
+    max_wait_duration: float
+    max_attempts: int
+
+    _retries: Dict[int, Retry]
+    _dirty: bool
+    _last_save: float
+
+    def __init__(
+        self,
+        path: Path,
+        wait_duration: float = 5,
+        max_wait_duration: float = 300,
+        max_attempts: int = 8
+    ):
+        self.queue_path = path.joinpath('retry_queue.json')
+        self.dead_letter_path = path.joinpath(RetryQueue.DEAD_LETTERS)
+
+        self.wait_duration = wait_duration
+        self.max_wait_duration = max_wait_duration
+        self.max_attempts = max_attempts
+
+        self._retries = {}
+        self._dirty = False
+        self._last_save = 0
+
+        # pick up retries left over from a previous run, anything that was in flight is due immediately
+        if self.queue_path.exists():
+            with open(self.queue_path) as f:
+                for retry_json in json.load(f):
+                    retry = Retry(**retry_json)
+                    retry.in_flight = False
+                    self._retries[retry.slot] = retry
+
+    def __len__(self):
+        return len(self._retries)
+
+    def __contains__(self, slot: int):
+        return slot in self._retries
+
+    def failed(self, slot: int, error: Exception):
+        """ Record a failed attempt for the slot, queueing it for retry or dead lettering it if out of attempts. """
+        retry = self._retries.get(slot, Retry(slot, 0, 0, ''))
+        retry.attempts += 1
+        retry.error = str(error)
+        retry.in_flight = False
+
+        if retry.attempts >= self.max_attempts:
+            self.dead_letter(slot, error)
+        else:
+            wait = min(self.wait_duration * 2 ** (retry.attempts - 1), self.max_wait_duration)
+            retry.due = time.time() + wait
+            self._retries[slot] = retry
+            self._dirty = True
+
+            print(f'Retrying slot {slot} in {wait} seconds: "{error}".')
+
+    def succeeded(self, slot: int):
+        """ Remove the slot from retries once it has been fetched. """
+        if self._retries.pop(slot, None) is not None:
+            self._dirty = True
+
+    def dead_letter(self, slot: int, error: Exception):
+        """ Give up on the slot, appending it to the dead letter file. """
+        print(f'Giving up on slot {slot}: "{error}".')
+
+        if self._retries.pop(slot, None) is not None:
+            self._dirty = True
+
+        self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.dead_letter_path, 'a') as f:
+            f.write(f'{slot}\t{json.dumps(str(error))}\n')
+
+    def due(self) -> List[int]:
+        """ Slots due for a retry in slot order, marked as in flight until they succeed or fail again. """
+        now = time.time()
+        due = sorted(slot for slot, retry in self._retries.items() if not retry.in_flight and retry.due <= now)
+        for slot in due:
+            self._retries[slot].in_flight = True
+
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """ Seconds until the next retry is due or None if there are no retries waiting. """
+        waiting = [retry.due for retry in self._retries.values() if not retry.in_flight]
+        return None if len(waiting) == 0 else max(min(waiting) - time.time(), 0)
+
+    def replay_dead_letters(self):
+        """ Queue all dead lettered slots to be retried immediately with fresh attempts. """
+        if not self.dead_letter_path.exists():
+            return
+
+        with open(self.dead_letter_path) as f:
+            for line in f:
+                slot = int(line.split('\t')[0])
+                self._retries[slot] = Retry(slot, 0, 0, 'Replayed from dead letters.')
+
+        self._dirty = True
+        self.save(True)
+        self.dead_letter_path.unlink()
+
+    def save(self, force: bool = False):
+        """ Persist the queue if changed, at most once a second unless forced. """
+        if not self._dirty or (not force and time.time() - self._last_save < 1):
+            return
+
+        # write and rename so a crash never leaves a partial queue
+        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.queue_path.with_name(f'{self.queue_path.name}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump([asdict(retry) for retry in self._retries.values()], f)
+        os.replace(temp_path, self.queue_path)
+
+        self._dirty = False
+        self._last_save = time.time()
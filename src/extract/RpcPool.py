@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Callable, List, Optional, TypeVar
+
+import requests
+
+from src.extract.JsonRpc import JsonRpc
+from src.extract.RateLimiter import RateLimiter
+
+T = TypeVar('T')
+
+
+class RpcEndpoint:
+    """
+    Clients for a single RPC endpoint with its own rate limiter, recent latency and error stats, and a circuit breaker
+    that stops routing to it after consecutive failures until a cooldown has passed.
+
+    @author zuyezheng
+    """
+
+    endpoint: str
+    rpc: JsonRpc
+    limiter: RateLimiter
+
+    # consecutive failures to open the circuit and the cooldown before a trial call, doubled each time it reopens
+    failure_threshold: int
+    cooldown: float
+    max_cooldown: float
+
+    calls: int
+    errors: int
+    # smoothed latency per request in seconds and rate of errors
+    latency: Optional[float]
+    error_rate: float
+
+    _lock: threading.Lock
+    _consecutive_failures: int
+    _trips: int
+    _open_until: float
+    _trial_in_flight: bool
+
+    def __init__(
+        self,
+        endpoint: str,
+        rate_limit: Optional[float] = None,
+        max_rate_limit: Optional[float] = None,
+        failure_threshold: int = 3,
+        cooldown: float = 5,
+        max_cooldown: float = 60
+    ):
+        self.endpoint = endpoint
+        self.rpc = JsonRpc(endpoint)
+        self.limiter = RateLimiter(rate_limit, max_rate_limit)
+
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.calls = 0
+        self.errors = 0
+        self.latency = None
+        self.error_rate = 0
+
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._trips = 0
+        self._open_until = 0
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """ If the circuit is open and no calls should be routed here. """
+        return time.monotonic() < self._open_until
+
+    @property
+    def score(self) -> float:
+        """ Expected seconds per successful request, lower is better and endpoints without stats are tried first. """
+        if self.latency is None:
+            return 0
+
+        return self.latency / max(1 - self.error_rate, 0.05)
+
+    def try_acquire(self) -> bool:
+        """ If a call can be made, after a cooldown only a single trial call is let through to test the endpoint. """
+        with self._lock:
+            if self.is_open:
+                return False
+
+            if self._trips > 0:
+                if self._trial_in_flight:
+                    return False
+
+                self._trial_in_flight = True
+
+            return True
+
+    def _succeeded(self, latency: float):
+        with self._lock:
+            self.calls += 1
+            self.latency = latency if self.latency is None else self.latency * 0.9 + latency * 0.1
+            self.error_rate *= 0.9
+
+            # close the circuit
+            self._consecutive_failures = 0
+            self._open_until = 0
+            self._trips = 0
+            self._trial_in_flight = False
+
+    def _failed(self):
+        with self._lock:
+            self.calls += 1
+            self.errors += 1
+            self.error_rate = self.error_rate * 0.9 + 0.1
+
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + min(self.cooldown * 2 ** self._trips, self.max_cooldown)
+                self._trips += 1
+                self._consecutive_failures = 0
+
+    def call(self, call: Callable[[RpcEndpoint], T], requests_made: int = 1) -> T:
+        """
+        Make call with this endpoint through its rate limiter, feeding back latency and any errors or throttling. A
+        batch should count each request made.
+        """
+        self.limiter.acquire(requests_made)
+
+        start = time.perf_counter()
+        try:
+            response = call(self)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                self.limiter.throttled(RateLimiter.retry_after(e.response.headers))
+            else:
+                self.limiter.failed()
+
+            self._failed()
+            raise
+        except Exception:
+            self.limiter.failed()
+            self._failed()
+            raise
+
+        latency = time.perf_counter() - start
+        self.limiter.succeeded(latency)
+        self._succeeded(latency / requests_made)
+
+        return response
+
+    def __str__(self):
+        latency = '-' if self.latency is None else f'{self.latency * 1000:.0f}ms'
+        state = 'open' if self.is_open else 'closed'
+
+        return f'{self.endpoint}: {latency}, {self.errors}/{self.calls} errors, ' \
+               f'rate limit {self.limiter}, circuit {state}'
+
+
+class RpcPool:
+    """
+    Route calls across multiple RPC endpoints to the one with the best recent latency and error rate, failing over to
+    the next best if a call fails.
+
+    @author zuyezheng
+    """
+
+    endpoints: List[RpcEndpoint]
+    # chance of routing to a random endpoint so stats for slower endpoints stay fresh
+    explore: float
+
+    def __init__(
+        self,
+        endpoints: List[str],
+        rate_limit: Optional[float] = None,
+        max_rate_limit: Optional[float] = None,
+        explore: float = 0.05
+    ):
+        self.endpoints = [RpcEndpoint(endpoint, rate_limit, max_rate_limit) for endpoint in endpoints]
+        self.explore = explore
+
+    def ranked(self) -> List[RpcEndpoint]:
+        """ Endpoints in the order they should be tried with those with open circuits or throttled last. """
+        ranked = sorted(self.endpoints, key=lambda e: (e.is_open, e.limiter.paused, e.score))
+        if len(ranked) > 1 and random.random() < self.explore:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+
+        return ranked
+
+    def call(self, call: Callable[[RpcEndpoint], T], requests_made: int = 1) -> T:
+        """ Make call with the best endpoint, trying each of the others in turn if it fails. """
+        ranked = self.ranked()
+
+        error = None
+        for endpoint in ranked:
+            if endpoint.try_acquire():
+                try:
+                    return endpoint.call(call, requests_made)
+                except Exception as e:
+                    error = e
+
+        if error is None:
+            # every circuit is open, try the best anyways instead of failing outright
+            return ranked[0].call(call, requests_made)
+
+        raise error
+
+    def __str__(self):
+        return '\n'.join(f'    {endpoint}' for endpoint in self.endpoints)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from src.extract.Codec import Codec
+
+
+class Segment:
+    """
+    Append only archive of blocks for a range of slots, each block compressed independently and located through a
+    compact index of slot, offset and length so any slot can be read directly.
+
+    Blocks are written before their index entries so a crash can at worst leave a torn block without an entry which
+    is truncated the next time the segment is opened for append.
+
+    @author zuyezheng
+    """
+
+    SUFFIX = '.seg'
+    INDEX_SUFFIX = '.idx'
+    # slot, offset and length of the compressed block
+    INDEX_ENTRY = struct.Struct('<QQI')
+
+    path: Path
+    index_path: Path
+    codec: Codec
+
+    _offsets: Dict[int, Tuple[int, int]]
+    # bytes of complete index entries
+    _index_size: int
+    _data: Optional[BinaryIO]
+    _index: Optional[BinaryIO]
+
+    @staticmethod
+    def path_for(path: Path, slot: int, slots_per_segment: int) -> Path:
+        """ Path of the segment in the directory that the slot belongs to. """
+        return path.joinpath(f'{slot // slots_per_segment * slots_per_segment}{Segment.SUFFIX}')
+
+    @staticmethod
+    def find(path: Path) -> List[Path]:
+        """ Segments in the given directory in slot order. """
+        return sorted(path.glob(f'*{Segment.SUFFIX}'), key=lambda p: int(p.stem))
+
+    def __init__(self, path: Path, codec: Optional[Codec] = None):
+        self.path = path
+        self.index_path = path.with_name(f'{path.name}{Segment.INDEX_SUFFIX}')
+        self.codec = Codec() if codec is None else codec
+
+        self._offsets = {}
+        self._index_size = 0
+        self._data = None
+        self._index = None
+
+        if self.index_path.exists():
+            with open(self.index_path, 'rb') as f:
+                index = f.read()
+
+            # ignore any partially written entry, later entries for the same slot replace earlier ones
+            self._index_size = len(index) - len(index) % Segment.INDEX_ENTRY.size
+            index = index[:self._index_size]
+            for slot, offset, length in Segment.INDEX_ENTRY.iter_unpack(index):
+                self._offsets[slot] = (offset, length)
+
+    def __enter__(self) -> Segment:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, slot: int):
+        return slot in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def slots(self) -> List[int]:
+        return sorted(self._offsets.keys())
+
+    def read(self, slot: int) -> bytes:
+        """ Decompressed block for the slot. """
+        offset, length = self._offsets[slot]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return self.codec.decompress(f.read(length))
+
+    def _open_for_append(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # truncate anything past the last indexed block or entry that could have been torn by a crash
+        data_end = max((offset + length for offset, length in self._offsets.values()), default=0)
+        self._data = open(self.path, 'ab')
+        self._data.truncate(data_end)
+        self._data.seek(0, os.SEEK_END)
+
+        self._index = open(self.index_path, 'ab')
+        self._index.truncate(self._index_size)
+        self._index.seek(0, os.SEEK_END)
+
+    def append(self, slot: int, block: bytes):
+        """ Compress and append the block, indexing it once written. """
+        self.append_compressed(slot, self.codec.compress(block))
+
+    def append_compressed(self, slot: int, compressed: bytes):
+        """ Append a block already compressed with the codec. """
+        if self._data is None:
+            self._open_for_append()
+
+        offset = self._data.tell()
+        self._data.write(compressed)
+        self._data.flush()
+
+        self._index.write(Segment.INDEX_ENTRY.pack(slot, offset, len(compressed)))
+        self._index.flush()
+        self._index_size += Segment.INDEX_ENTRY.size
+
+        self._offsets[slot] = (offset, len(compressed))
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._index.close()
+
+            self._data = None
+            self._index = None
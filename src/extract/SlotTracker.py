@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import websockets
+
+
+class SlotTracker:
+    """
+    Track the latest slot at a commitment through a websocket subscription, slotSubscribe for confirmed and
+    rootSubscribe for finalized. While the websocket is down the slot is polled with getSlot instead, reconnecting
+    with backoff.
+
+    @author zuyezheng
+    """
+
+    websocket_endpoint: str
+    commitment: str
+    # get the latest slot at the commitment when the websocket is down
+    poll: Callable[[], int]
+    poll_interval: float
+    # seconds without a notification before the subscription is considered dead
+    silence_timeout: float
+    max_reconnect_wait: float
+
+    latest: Optional[int]
+
+    _condition: threading.Condition
+    _loop: asyncio.AbstractEventLoop
+    _task: asyncio.Task
+    _thread: threading.Thread
+
+    @staticmethod
+    def websocket_for(endpoint: str) -> str:
+        """ Websocket endpoint for a RPC endpoint which is on the next port if one is specified. """
+        url = urlparse(endpoint)
+        netloc = url.netloc if url.port is None else f'{url.hostname}:{url.port + 1}'
+
+        return url._replace(scheme='wss' if url.scheme == 'https' else 'ws', netloc=netloc).geturl()
+
+    def __init__(
+        self,
+        websocket_endpoint: str,
+        poll: Callable[[], int],
+        commitment: str = 'confirmed',
+        poll_interval: float = 0.4,
+        silence_timeout: float = 10,
+        max_reconnect_wait: float = 30
+    ):
+        self.websocket_endpoint = websocket_endpoint
+        self.poll = poll
+        self.commitment = commitment
+        self.poll_interval = poll_interval
+        self.silence_timeout = silence_timeout
+        self.max_reconnect_wait = max_reconnect_wait
+
+        self.latest = None
+
+        self._condition = threading.Condition()
+        self._loop = asyncio.new_event_loop()
+        self._task = self._loop.create_task(self._follow())
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> SlotTracker:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _run(self):
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def _update(self, slot: int):
+        with self._condition:
+            if self.latest is None or slot > self.latest:
+                self.latest = slot
+                self._condition.notify_all()
+
+    async def _subscribe(self):
+        method, notification = ('rootSubscribe', 'rootNotification') if self.commitment == 'finalized' \
+            else ('slotSubscribe', 'slotNotification')
+
+        async with websockets.connect(self.websocket_endpoint) as websocket:
+            await websocket.send(json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method}))
+
+            while True:
+                message_json = json.loads(await asyncio.wait_for(websocket.recv(), self.silence_timeout))
+                if message_json.get('method') == notification:
+                    result = message_json['params']['result']
+                    self._update(result if isinstance(result, int) else result['slot'])
+
+    async def _poll_for(self, duration: float):
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            try:
+                self._update(await self._loop.run_in_executor(None, self.poll))
+            except Exception as e:
+                print(f'Unable to poll for slot: "{e}".')
+
+            await asyncio.sleep(self.poll_interval)
+
+    async def _follow(self):
+        reconnect_wait = 1
+        while True:
+            connected = time.monotonic()
+            try:
+                await self._subscribe()
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                print(f'Slot subscription to {self.websocket_endpoint} failed, polling instead: "{e}".')
+
+            # reset the backoff if the subscription was up for a while
+            if time.monotonic() - connected > self.max_reconnect_wait:
+                reconnect_wait = 1
+
+            await self._poll_for(reconnect_wait)
+            reconnect_wait = min(reconnect_wait * 2, self.max_reconnect_wait)
+
+    def wait_for(self, slot: int, timeout: Optional[float] = None) -> Optional[int]:
+        """ Wait until the latest slot is at least slot, returning the latest which could be None on timeout. """
+        with self._condition:
+            self._condition.wait_for(lambda: self.latest is not None and self.latest >= slot, timeout)
+            return self.latest
+
+    def close(self):
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._task.cancel)
+            self._thread.join()
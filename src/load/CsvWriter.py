@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import csv
+import shutil
+from pathlib import Path
+from typing import List, TextIO, Tuple
+
+from src.load.RollingWriter import RollingWriter
+
+
+class CsvWriter(RollingWriter):
+    """
+    Write rows to rolling CSV parts through long lived file handles. Output matches pandas to_csv, a header followed
+    by rows.
+
+    @author zuyezheng
+    """
+
+    SUFFIX = '.csv'
+
+    def __init__(self, max_rows: int = 10_000, max_file_size: int = 256 * 1024 * 1024, max_seconds: float = 5):
+        super().__init__(max_rows, max_file_size, max_seconds)
+
+    def _open(self, staged_path: Path, meta: List[Tuple[str, str]]) -> Tuple[TextIO, csv.writer]:
+        f = open(staged_path, 'w', newline='')
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow([c[0] for c in meta])
+
+        return f, writer
+
+    def _append(self, handle: Tuple[TextIO, csv.writer], meta: List[Tuple[str, str]], rows: List[List[any]]):
+        handle[1].writerows(rows)
+
+    def _size(self, handle: Tuple[TextIO, csv.writer], staged_path: Path) -> int:
+        # include what's still buffered by the handle
+        return handle[0].tell()
+
+    def _close(self, handle: Tuple[TextIO, csv.writer]):
+        handle[0].close()
+
+    def _merge(self, part_paths: List[Path], staged_path: Path):
+        with open(staged_path, 'wb') as f:
+            for i, part_path in enumerate(part_paths):
+                with open(part_path, 'rb') as part:
+                    # only keep the header of the first part
+                    if i > 0:
+                        part.readline()
+                    shutil.copyfileobj(part, f)
@@ -14,6 +14,8 @@ import dask.bag as bag
 from dask.delayed import Delayed
 from distributed import LocalCluster, Client
 
+from src.extract.Codec import Codec, Compression
+from src.extract.Segment import Segment
 from src.load.TransformTask import TransformTask
 from src.transform.Block import Block
 
@@ -30,6 +32,10 @@ class FileOutput:
 
     blocks_path: Path
     _has_subdirs: bool
+    _has_segments: bool
+    # suffix of block files and codec to read them or segments with
+    _suffix: str
+    _codec: Codec
 
     _client: Client
 
@@ -60,8 +66,72 @@ class FileOutput:
         self.blocks_path = Path(blocks_dir)
         self._client = client
 
-        # if all files in the blocks directories are directories, then go into each
-        self._has_subdirs = all(map(lambda p: p.is_dir(), self.blocks_path.iterdir()))
+        # if all blocks in the blocks directories are in directories, then go into each, ignoring sidecar files from
+        # extract such as skipped slots and retries
+        self._has_subdirs = all(map(lambda p: p.is_dir(), self._block_paths()))
+        # blocks could also be archived in segments instead of a file per block
+        self._has_segments = any(map(lambda p: p.suffix == Segment.SUFFIX, self._block_paths()))
+        self._suffix = self._find_suffix()
+        # dictionaries for zstd blocks are saved in the root of the archive
+        self._codec = Codec.for_archive(self.blocks_path)
+
+    def _block_paths(self) -> List[Path]:
+        """ Block files, segments, or subdirectories of block files in the blocks directory. """
+        return [
+            p for p in self.blocks_path.iterdir()
+            if p.is_dir() or FileOutput._is_block_file(p) or p.suffix == Segment.SUFFIX
+        ]
+
+    @staticmethod
+    def _is_block_file(path: Path) -> bool:
+        return any(path.name.endswith(f'.json{compression.suffix}') for compression in Compression)
+
+    def _find_suffix(self) -> str:
+        """ Suffix of block files from the first one found, archives are expected to use a single compression. """
+        for path in self._block_paths():
+            for block_path in (path.iterdir() if path.is_dir() else [path]):
+                if FileOutput._is_block_file(block_path):
+                    return ''.join(block_path.suffixes[-2:])
+
+        return f'.json{Compression.GZIP.suffix}'
+
+    @staticmethod
+    def _read_from_segments(codec: Codec, segments_and_slots: List[Tuple[str, int]]) -> List[Tuple[str, str]]:
+        """ Read block json and path tuples for a partition of segment and slot tuples. """
+        segments = {}
+        blocks = []
+        for segment_path, slot in segments_and_slots:
+            if segment_path not in segments:
+                segments[segment_path] = Segment(Path(segment_path), codec)
+
+            blocks.append((segments[segment_path].read(slot).decode('utf-8'), f'{segment_path}/{slot}'))
+
+        return blocks
+
+    @staticmethod
+    def _read_from_files(codec: Codec, paths: List[str]) -> List[Tuple[str, str]]:
+        """ Read block json and path tuples for a partition of block files. """
+        return [(codec.read(Path(path)).decode('utf-8'), path) for path in paths]
+
+    def read_blocks(self, source: str | list[str]) -> bag.Bag:
+        """ Bag of block json and path tuples from globs of block files or segments. """
+        sources = [source] if isinstance(source, str) else source
+
+        if self._has_segments:
+            segments_and_slots = [
+                (segment_path, slot) for segment_path in sources for slot in Segment(Path(segment_path)).slots()
+            ]
+
+            return bag.from_sequence(segments_and_slots, partition_size=16) \
+                .map_partitions(partial(FileOutput._read_from_segments, self._codec))
+        elif self._suffix == f'.json{Compression.ZSTD.suffix}':
+            # zstd blocks could need a dictionary so read them with the codec instead of as text
+            paths = sorted(str(path) for glob in sources for path in Path(glob).parent.glob(Path(glob).name))
+
+            return bag.from_sequence(paths, partition_size=16) \
+                .map_partitions(partial(FileOutput._read_from_files, self._codec))
+        else:
+            return bag.read_text(source, include_path=True, files_per_partition=16)
 
     @staticmethod
     def transform(
@@ -94,19 +164,29 @@ class FileOutput:
         self, destination_dir: str, keep_subdirs: bool = False
     ) -> list[tuple[str | list[str], Path]]:
         """
-        Build the tuples of source glob and destination path. There could be multiple tuples for subdirectories and
-        some sources could be a list of globs.
+        Build the tuples of source glob or segment and destination path. There could be multiple tuples for
+        subdirectories or segments and some sources could be a list of globs or segments.
         """
         destination_path = Path(destination_dir)
 
+        if self._has_segments:
+            segment_paths = Segment.find(self.blocks_path)
+            if keep_subdirs:
+                # segments are equivalent to subdirectories of blocks
+                return [
+                    (str(segment_path), destination_path.joinpath(segment_path.stem)) for segment_path in segment_paths
+                ]
+            else:
+                return [(list(map(str, segment_paths)), destination_path)]
+
         def build_glob(path: Path) -> str:
-            return f'{str(path)}/*.json.gz'
+            return f'{str(path)}/*{self._suffix}'
 
         source_and_destinations = []
         if self._has_subdirs:
             if keep_subdirs:
                 # build out tuple for each subdirectory
-                for subdir_path in self.blocks_path.iterdir():
+                for subdir_path in self._block_paths():
                     source_and_destinations.append((
                         build_glob(subdir_path), destination_path.joinpath(subdir_path.name)
                     ))
@@ -115,7 +195,7 @@ class FileOutput:
                 source_and_destinations.append((
                     list(map(
                         build_glob,
-                        [subdir_path for subdir_path in self.blocks_path.iterdir()]
+                        [subdir_path for subdir_path in self._block_paths()]
                     )),
                     destination_path
                 ))
@@ -139,7 +219,7 @@ class FileOutput:
             # pickling gets tricky with the enum so convert it to a dict with name -> transform
             transforms = {task.name: task.transform for task in tasks}
 
-            results_with_errors = bag.read_text(source, include_path=True, files_per_partition=16) \
+            results_with_errors = self.read_blocks(source) \
                 .map(lambda json_and_path: FileOutput.transform(transforms, json_and_path))
 
             # extract out the specific transform results, flatten, and create a delayed task to output to file
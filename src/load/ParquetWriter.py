@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import fastparquet
+from pandas import DataFrame
+
+from src.load.RollingWriter import RollingWriter
+
+
+class ParquetWriter(RollingWriter):
+    """
+    Write rows to rolling Parquet parts, each batch of buffered rows written as a row group typed by the meta of the
+    output.
+
+    @author zuyezheng
+    """
+
+    SUFFIX = '.parquet'
+
+    def __init__(
+        self, max_rows: int = 100_000, max_file_size: int = 256 * 1024 * 1024, max_seconds: Optional[float] = None
+    ):
+        # each write is a row group so by default only write on rows to keep them large
+        super().__init__(max_rows, max_file_size, max_seconds)
+
+    @staticmethod
+    def _to_df(meta: List[Tuple[str, str]], rows: List[List[any]]) -> DataFrame:
+        return DataFrame(rows, columns=[c[0] for c in meta]).astype(dict(meta))
+
+    def _open(self, staged_path: Path, meta: List[Tuple[str, str]]) -> Path:
+        # start with just the schema so parts without rows are still readable
+        fastparquet.write(str(staged_path), ParquetWriter._to_df(meta, []))
+        return staged_path
+
+    def _append(self, handle: Path, meta: List[Tuple[str, str]], rows: List[List[any]]):
+        fastparquet.write(str(handle), ParquetWriter._to_df(meta, rows), append=True)
+
+    def _close(self, handle: Path):
+        # every row group is written through so there's nothing left to close
+        pass
+
+    def _merge(self, part_paths: List[Path], staged_path: Path):
+        # append a part at a time as row groups so merging doesn't hold all of them in memory
+        for i, part_path in enumerate(part_paths):
+            fastparquet.write(str(staged_path), fastparquet.ParquetFile(str(part_path)).to_pandas(), append=i > 0)
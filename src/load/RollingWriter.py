@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from abc import abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class RollingWriter:
+    """
+    Write rows for named outputs to numbered parts of the paths they're given, buffering rows across many writes. Parts
+    are staged under a temporary name and only moved into place when committed, so readers never see a partial file
+    and anything staged but never committed can be discarded.
+
+    Each name has a single open part at a time, rolling to the next part once over the size threshold, when written to
+    a new path and when prepared for a commit. Finished parts stay staged until committed, so how often to commit is
+    left to the caller with rolled to tell when parts have already been finished. Small parts from frequent commits can
+    later be merged, staged and committed the same way with the parts merged away removed after.
+
+    @author zuyezheng
+    """
+
+    SUFFIX = ''
+    STAGED_SUFFIX = '.inprogress'
+
+    # buffered rows across all outputs and seconds since last writing them before writing them out, None to only
+    # write on rows
+    max_rows: int
+    max_seconds: Optional[float]
+    # bytes in a part before rolling to the next
+    max_file_size: int
+
+    _outputs: Dict[str, _Output]
+    # staged parts finished and waiting to be committed
+    _finished: List[Path]
+    # parts merged into finished parts to remove once they're committed
+    _replaced: List[Path]
+    # next part number for each path
+    _parts: Dict[Path, int]
+    _buffered: int
+    _last_write: float
+
+    @staticmethod
+    def staged(path: Path) -> Path:
+        return path.with_name(f'{path.name}{RollingWriter.STAGED_SUFFIX}')
+
+    @staticmethod
+    def commit_staged(path: Path):
+        """ Move the staged file for path into place if it hasn't been already. """
+        staged_path = RollingWriter.staged(path)
+        if staged_path.exists():
+            os.replace(staged_path, path)
+
+    @staticmethod
+    def discard_staged(path: Path):
+        """ Remove files left staged in path that were never committed. """
+        for staged_path in path.glob(f'*{RollingWriter.STAGED_SUFFIX}'):
+            staged_path.unlink()
+
+    def __init__(self, max_rows: int, max_file_size: int, max_seconds: Optional[float] = None):
+        self.max_rows = max_rows
+        self.max_file_size = max_file_size
+        self.max_seconds = max_seconds
+
+        self._outputs = {}
+        self._finished = []
+        self._replaced = []
+        self._parts = {}
+        self._buffered = 0
+        self._last_write = time.monotonic()
+
+    def __enter__(self) -> RollingWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @abstractmethod
+    def _open(self, staged_path: Path, meta: List[Tuple[str, str]]) -> any:
+        """ Create a part at the staged path, returning a handle to append rows with. """
+        raise NotImplemented
+
+    @abstractmethod
+    def _append(self, handle: any, meta: List[Tuple[str, str]], rows: List[List[any]]):
+        raise NotImplemented
+
+    @abstractmethod
+    def _close(self, handle: any):
+        """ Close the handle, called for parts that won't be committed as well as before syncing them. """
+        raise NotImplemented
+
+    @abstractmethod
+    def _merge(self, part_paths: List[Path], staged_path: Path):
+        """ Write rows of all parts in order to a single part at the staged path. """
+        raise NotImplemented
+
+    def _size(self, handle: any, staged_path: Path) -> int:
+        """ Bytes written to a part so far. """
+        return staged_path.stat().st_size
+
+    def _committed_parts(self, path: Path) -> List[Tuple[int, Path]]:
+        """ Numbers and paths of committed parts for path in order. """
+        stem = path.name[:-len(self.SUFFIX)]
+        pattern = re.compile(rf'{re.escape(stem)}\.(\d+){re.escape(self.SUFFIX)}')
+
+        parts = []
+        for part_path in path.parent.glob(f'{stem}.*{self.SUFFIX}'):
+            match = pattern.fullmatch(part_path.name)
+            if match is not None:
+                parts.append((int(match.group(1)), part_path))
+
+        return sorted(parts)
+
+    def _next_part(self, path: Path) -> Path:
+        """ Path of the next numbered part for path after any already written. """
+        part = self._parts.get(path)
+        if part is None:
+            part = max([-1] + [number for number, _ in self._committed_parts(path)]) + 1
+
+        self._parts[path] = part + 1
+        return path.with_name(f'{path.name[:-len(self.SUFFIX)]}.{part}{self.SUFFIX}')
+
+    def write(self, name: str, path: Path, meta: List[Tuple[str, str]], rows: List[List[any]]):
+        """ Buffer rows for the output of name at path with columns and types from meta. """
+        output = self._outputs.get(name)
+        if output is None or output.path != path:
+            if output is not None:
+                self._buffered -= len(output.rows)
+                self._finish(output)
+
+            output = _Output(path, meta)
+            self._outputs[name] = output
+
+        output.rows.extend(rows)
+        self._buffered += len(rows)
+
+        if self._buffered >= self.max_rows or \
+                (self.max_seconds is not None and time.monotonic() - self._last_write >= self.max_seconds):
+            self._write_buffered()
+
+    def _write_rows(self, output: _Output):
+        if output.handle is None:
+            output.path.parent.mkdir(parents=True, exist_ok=True)
+            output.staged_path = RollingWriter.staged(self._next_part(output.path))
+            output.handle = self._open(output.staged_path, output.meta)
+
+        if len(output.rows) > 0:
+            self._append(output.handle, output.meta, output.rows)
+            output.rows = []
+
+    def _write_buffered(self):
+        for name, output in list(self._outputs.items()):
+            if len(output.rows) > 0:
+                self._write_rows(output)
+
+                if self._size(output.handle, output.staged_path) >= self.max_file_size:
+                    self._finish(output)
+                    del self._outputs[name]
+
+        self._buffered = 0
+        self._last_write = time.monotonic()
+
+    @staticmethod
+    def _sync(path: Path):
+        with open(path, 'rb+') as f:
+            os.fsync(f.fileno())
+
+    def _finish(self, output: _Output):
+        """ Write remaining rows and sync the part so it's ready to be committed. """
+        self._write_rows(output)
+        self._close(output.handle)
+
+        RollingWriter._sync(output.staged_path)
+        self._finished.append(output.staged_path)
+
+    @property
+    def rolled(self) -> bool:
+        """ If any parts were finished by rolling over since the last commit. """
+        return len(self._finished) > 0
+
+    def prepare(self) -> List[Path]:
+        """ Finish all parts, returning the paths they will be committed to. """
+        try:
+            for output in self._outputs.values():
+                self._finish(output)
+        finally:
+            self._outputs = {}
+            self._buffered = 0
+
+        return [p.with_name(p.name[:-len(self.STAGED_SUFFIX)]) for p in self._finished]
+
+    def _stage_merge(self, part_paths: List[Path]):
+        if len(part_paths) > 1:
+            staged_path = RollingWriter.staged(part_paths[0])
+            self._merge(part_paths, staged_path)
+            RollingWriter._sync(staged_path)
+
+            self._finished.append(staged_path)
+            self._replaced.extend(part_paths[1:])
+
+    def prepare_merge(self, paths: Iterable[Path]) -> Tuple[List[Path], List[Path]]:
+        """
+        Merge committed parts of each path into as few parts as possible without going over the size threshold, each
+        staged to replace the first part merged into it. Returns the paths merged parts will be committed to and the
+        paths of the other parts that will be removed, to be committed like prepared parts.
+        """
+        if len(self._finished) > 0:
+            raise ValueError('Parts need to be committed before merging them.')
+
+        for path in paths:
+            group = []
+            size = 0
+            for _, part_path in self._committed_parts(path):
+                part_size = part_path.stat().st_size
+                if len(group) > 0 and size + part_size > self.max_file_size:
+                    self._stage_merge(group)
+                    group = []
+                    size = 0
+
+                group.append(part_path)
+                size += part_size
+
+            self._stage_merge(group)
+
+        return [p.with_name(p.name[:-len(self.STAGED_SUFFIX)]) for p in self._finished], list(self._replaced)
+
+    def commit(self):
+        """
+        Move prepared parts into place, later rows for the same outputs are written to new parts. Parts merged away are
+        removed after.
+        """
+        for staged_path in self._finished:
+            os.replace(staged_path, staged_path.with_name(staged_path.name[:-len(self.STAGED_SUFFIX)]))
+        for replaced_path in self._replaced:
+            if replaced_path.exists():
+                replaced_path.unlink()
+
+        self._finished = []
+        self._replaced = []
+
+    def close(self):
+        """ Close any open parts, anything not committed is left staged. """
+        try:
+            for output in self._outputs.values():
+                if output.handle is not None:
+                    self._close(output.handle)
+        finally:
+            self._outputs = {}
+            self._buffered = 0
+
+
+class _Output:
+    """ Rows buffered for a path and the staged part they're written to. """
+
+    path: Path
+    meta: List[Tuple[str, str]]
+    rows: List[List[any]]
+
+    staged_path: Optional[Path]
+    handle: Optional[any]
+
+    def __init__(self, path: Path, meta: List[Tuple[str, str]]):
+        self.path = path
+        self.meta = meta
+        self.rows = []
+
+        self.staged_path = None
+        self.handle = None
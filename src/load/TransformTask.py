@@ -6,14 +6,16 @@ from typing import Iterable, Set, List, Tuple, Callable
 
 from pandas import DataFrame
 
-from src.transform.AccountType import AccountType
+from src.extract.BlockParams import BlockParams, TransactionDetails
 from src.transform.BalanceChange import BalanceChangeAgg
 from src.transform.Block import Block
+from src.transform.BlockMetrics import BlockMetrics
 from src.transform.Interactions import Interactions
 from src.transform.Transfer import Transfer
 
 ResultsAndErrors = Tuple[List[List[any]], List[List[any]]]
 Transform = Callable[[Block], ResultsAndErrors]
+ERROR_META = [('name', 'string'), ('block', 'string'), ('message', 'string')]
 
 
 def block_to_transactions(block: Block) -> ResultsAndErrors:
@@ -81,29 +83,20 @@ def block_to_transfers(block: Block) -> ResultsAndErrors:
 
 
 def block_info(block: Block) -> ResultsAndErrors:
+    columns = block.columns
     row = [
         block.epoch,
         block.hash,
         str(block.source),
-        len(block.transactions)
+        len(columns)
     ]
 
-    for transactions in [block.transactions.successful, block.transactions.errors]:
-        row.extend([
-            len(transactions),
-            len(transactions.votes),
-            len(transactions.more_than_fee),
-            len(transactions.only_fee),
-            transactions.fees,
-            transactions.balance_change(BalanceChangeAgg.OUT).v
-        ])
-
-        accounts_by_type = transactions.accounts_by_type
-        for account_type in [AccountType.PROGRAM, AccountType.COIN, AccountType.TOKEN]:
-            row.append(len(accounts_by_type.get(account_type, [])))
+    for metrics in BlockMetrics.by_success(columns):
+        row.extend(metrics.row)
 
     return [row], []
 
+
 class TransformTask(Enum):
     """
     Tasks that perform a set of transformations and returns a set of loadable results and metadata.
@@ -130,7 +123,9 @@ class TransformTask(Enum):
             ('tokensIn', 'string'),
             ('blockhash', 'string'),
             ('path', 'string')
-        ]
+        ],
+        # programs come from instructions
+        TransactionDetails.FULL
     )
     TRANSFERS = (
         block_to_transfers,
@@ -145,7 +140,9 @@ class TransformTask(Enum):
             ('transaction', 'string'),
             ('blockhash', 'string'),
             ('path', 'string')
-        ]
+        ],
+        # transfers are parsed from instructions
+        TransactionDetails.FULL
     )
     BLOCKS = (
         block_info,
@@ -172,7 +169,9 @@ class TransformTask(Enum):
             ('errorProgramAccounts', 'int64'),
             ('errorCoinAccounts', 'int64'),
             ('errorTokenAccounts', 'int64')
-        ]
+        ],
+        # votes and program accounts come from instructions so full transactions are still needed
+        TransactionDetails.FULL
     )
 
     @staticmethod
@@ -191,16 +190,31 @@ class TransformTask(Enum):
 
         return tasks
 
+    @staticmethod
+    def block_params(tasks: Iterable[TransformTask]) -> BlockParams:
+        """ Minimum parts of blocks needed from RPC for all tasks. """
+        return BlockParams.combine(task.params for task in tasks)
+
     @staticmethod
     def errors_to_df(errors: List[List[any]]) -> DataFrame:
-        return DataFrame(errors, columns=['name', 'block', 'message'])
+        return DataFrame(errors, columns=list(map(lambda c: c[0], ERROR_META)))
 
     transform: Transform
     meta: List[(str, str)]
+    # least transaction detail from getBlock the transform needs
+    details: TransactionDetails
+    # parts of the block needed from getBlock for it
+    params: BlockParams
 
-    def __init__(self, transform: Transform, meta: List[(str, str)]):
+    def __init__(self, transform: Transform, meta: List[(str, str)], details: TransactionDetails):
         self.transform = transform
         self.meta = meta
+        self.details = details
+        self.params = BlockParams(details, rewards=False)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(map(lambda c: c[0], self.meta))
 
     def to_df(self, rows: List[List[any]]) -> DataFrame:
-        return DataFrame(rows, columns=list(map(lambda c: c[0], self.meta)))
+        return DataFrame(rows, columns=self.columns)
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-import gzip
 import json
 import time
 from functools import cached_property
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
+from src.extract.Codec import Codec, Compression
+from src.extract.Segment import Segment
+from src.transform.BlockColumns import BlockColumns
 from src.transform.Transaction import Transaction
 from src.transform.Transactions import Transactions
 
@@ -23,14 +25,19 @@ class Block:
     missing: bool
 
     @staticmethod
-    def open(path: Path):
-        def _open():
-            if path.suffix == '.gz':
-                return gzip.open(path)
-            else:
-                return open(path)
-
-        with _open() as f:
+    def open(path: Path, slot: Optional[int] = None, codec: Optional[Codec] = None):
+        """
+        Open a block from a JSON file that could be compressed or from a segment by slot, compressed blocks are read
+        with dictionaries from the archive if a codec isn't provided.
+        """
+        if path.suffix == Segment.SUFFIX:
+            segment = Segment(path, Codec.for_block(path) if codec is None else codec)
+            return Block(json.loads(segment.read(slot)), path.joinpath(str(slot)))
+
+        if path.suffix in {compression.suffix for compression in Compression}:
+            return Block(json.loads((Codec.for_block(path) if codec is None else codec).read(path)), path)
+
+        with open(path) as f:
             return Block(json.load(f), path)
 
     def __init__(self, block_meta: Dict, source: str):
@@ -48,7 +55,8 @@ class Block:
         return self.result['blockhash']
 
     def has_transactions(self) -> bool:
-        return not self.missing and len(self.result['transactions']) > 0
+        # transactions could have been left out of the request
+        return not self.missing and len(self.result.get('transactions', [])) > 0
 
     @property
     def epoch(self) -> int:
@@ -68,6 +76,11 @@ class Block:
         else:
             return Transactions([])
 
+    @cached_property
+    def columns(self) -> BlockColumns:
+        """ Columnar view of transactions for block level aggregates without parsing them. """
+        return BlockColumns(self.result['transactions'] if self.has_transactions() else [])
+
     def find_transaction(self, signature: str) -> Transaction | None:
         """ Linear search for an instruction with the given signature. """
         for transaction in self.transactions:
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+import numpy as np
+
+from src.transform.AccountType import AccountType
+from src.transform.BalanceChange import BalanceChangeAgg
+
+
+class BlockColumns:
+    """
+    Columnar view of the transactions in a block built in a single pass over the JSON without parsing transactions.
+    Per transaction columns are indexed by transaction, per account columns are flattened across transactions with
+    offsets marking where each transaction's accounts start so aggregates are vectorized reductions. Accounts and
+    programs are ids into keys shared across the block.
+
+    @author zuyezheng
+    """
+
+    # unique account keys across the block, ids index into this
+    keys: List[str]
+
+    # per transaction
+    fee: np.ndarray
+    successful: np.ndarray
+    # if there are any parsed outer vote instructions
+    votes: np.ndarray
+
+    # per account of each transaction, accounts of transaction i are in [account_offsets[i], account_offsets[i + 1])
+    account_offsets: np.ndarray
+    account_ids: np.ndarray
+    pre_balances: np.ndarray
+    post_balances: np.ndarray
+    # if the account has token balances in the transaction
+    token_accounts: np.ndarray
+
+    # programs of outer and inner instructions of each transaction with the same layout as accounts
+    program_offsets: np.ndarray
+    program_ids: np.ndarray
+
+    def __init__(self, transactions: List[Dict[str, any]]):
+        ids = {}
+
+        def to_id(key: str) -> int:
+            key_id = ids.get(key)
+            if key_id is None:
+                key_id = len(ids)
+                ids[key] = key_id
+
+            return key_id
+
+        fee = []
+        successful = []
+        votes = []
+        account_counts = []
+        account_ids = []
+        pre_balances = []
+        post_balances = []
+        token_indices = []
+        program_counts = []
+        program_ids = []
+
+        for transaction_meta in transactions:
+            meta = transaction_meta['meta']
+            message = transaction_meta['transaction']['message']
+
+            fee.append(meta['fee'])
+            successful.append(meta['err'] is None)
+            votes.append(any(
+                'parsed' in instruction and instruction['program'] == 'vote' for instruction in message['instructions']
+            ))
+
+            # token balances reference accounts by index in the transaction, offset them into the flattened accounts
+            offset = len(account_ids)
+            account_keys = message['accountKeys']
+            account_counts.append(len(account_keys))
+            account_ids.extend(to_id(key if isinstance(key, str) else key['pubkey']) for key in account_keys)
+            pre_balances.extend(meta['preBalances'])
+            post_balances.extend(meta['postBalances'])
+            token_indices.extend(offset + b['accountIndex'] for b in meta['preTokenBalances'])
+            token_indices.extend(offset + b['accountIndex'] for b in meta['postTokenBalances'])
+
+            program_count = len(program_ids)
+            program_ids.extend(to_id(instruction['programId']) for instruction in message['instructions'])
+            for inner in meta['innerInstructions']:
+                program_ids.extend(to_id(instruction['programId']) for instruction in inner['instructions'])
+            program_counts.append(len(program_ids) - program_count)
+
+        self.keys = list(ids.keys())
+
+        self.fee = np.array(fee, dtype=np.int64)
+        self.successful = np.array(successful, dtype=bool)
+        self.votes = np.array(votes, dtype=bool)
+
+        self.account_offsets = BlockColumns._offsets(account_counts)
+        self.account_ids = np.array(account_ids, dtype=np.int64)
+        self.pre_balances = np.array(pre_balances, dtype=np.int64)
+        self.post_balances = np.array(post_balances, dtype=np.int64)
+        self.token_accounts = np.zeros(len(account_ids), dtype=bool)
+        self.token_accounts[np.array(token_indices, dtype=np.int64)] = True
+
+        self.program_offsets = BlockColumns._offsets(program_counts)
+        self.program_ids = np.array(program_ids, dtype=np.int64)
+
+    @staticmethod
+    def _offsets(counts: List[int]) -> np.ndarray:
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets
+
+    @staticmethod
+    def _sum_by_transaction(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """ Sum flattened values for each transaction, transactions without values sum to 0. """
+        sums = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(values, out=sums[1:])
+        return sums[offsets[1:]] - sums[offsets[:-1]]
+
+    def __len__(self):
+        return len(self.fee)
+
+    @property
+    def account_transactions(self) -> np.ndarray:
+        """ Index of the transaction for each flattened account. """
+        return np.repeat(np.arange(len(self)), np.diff(self.account_offsets))
+
+    @property
+    def program_accounts(self) -> np.ndarray:
+        """ If the flattened account is the program of any instruction in its transaction. """
+        # pair transactions with ids so accounts only match programs from the same transaction
+        num_keys = len(self.keys)
+        program_transactions = np.repeat(np.arange(len(self)), np.diff(self.program_offsets))
+        return np.isin(
+            self.account_transactions * num_keys + self.account_ids,
+            program_transactions * num_keys + self.program_ids
+        )
+
+    def balance_changes(self, agg: BalanceChangeAgg = BalanceChangeAgg.ALL) -> np.ndarray:
+        """ Lamports changed in each transaction, matching Transaction.total_account_balance_change. """
+        changes = self.post_balances - self.pre_balances
+        if agg == BalanceChangeAgg.ABS:
+            changes = np.abs(changes)
+        elif agg == BalanceChangeAgg.IN:
+            changes = np.maximum(changes, 0)
+        elif agg == BalanceChangeAgg.OUT:
+            changes = np.minimum(changes, 0)
+
+        return BlockColumns._sum_by_transaction(changes, self.account_offsets)
+
+    @property
+    def only_fee(self) -> np.ndarray:
+        """ Transactions where the only balance change was the fee. """
+        return self.balance_changes() == -self.fee
+
+    @property
+    def account_types(self) -> Dict[AccountType, np.ndarray]:
+        """ Masks of flattened accounts of each type, matching Transaction.accounts_by_type. """
+        is_sysvar = np.fromiter((key.lower().startswith('sysvar') for key in self.keys), bool, len(self.keys))
+        sysvar_accounts = is_sysvar[self.account_ids]
+        program_accounts = self.program_accounts
+
+        return {
+            AccountType.SYSVAR: sysvar_accounts,
+            AccountType.PROGRAM: program_accounts,
+            AccountType.TOKEN: self.token_accounts,
+            AccountType.COIN: ~(sysvar_accounts | program_accounts | self.token_accounts)
+        }
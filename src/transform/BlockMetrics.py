@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from src.transform.AccountType import AccountType
+from src.transform.BalanceChange import BalanceChangeAgg
+from src.transform.BlockColumns import BlockColumns
+
+
+@dataclass
+class BlockMetrics:
+    """
+    Aggregate metrics for a group of transactions in a block. All groups are aggregated together in a single pass over
+    the columns of the block so tasks can break down the same metrics by whatever groups they need.
+
+    @author zuyezheng
+    """
+
+    transactions: int
+    votes: int
+    more_than_fee: int
+    only_fee: int
+    fees: int
+    balance_change: int
+    program_accounts: int
+    coin_accounts: int
+    token_accounts: int
+
+    @staticmethod
+    def group_by(columns: BlockColumns, groups: np.ndarray, num_groups: int) -> List[BlockMetrics]:
+        """ Metrics for each group given the group in [0, num_groups) of each transaction. """
+        def count(selected: np.ndarray) -> np.ndarray:
+            return np.bincount(groups[selected], minlength=num_groups)
+
+        def total(values: np.ndarray) -> np.ndarray:
+            # bincount sums with floats so add in place to keep lamports exact
+            totals = np.zeros(num_groups, dtype=np.int64)
+            np.add.at(totals, groups, values)
+            return totals
+
+        only_fee = columns.only_fee
+        transactions = count(np.ones(len(columns), dtype=bool))
+        only_fees = count(only_fee)
+        votes = count(columns.votes)
+        fees = total(columns.fee)
+        balance_changes = total(columns.balance_changes(BalanceChangeAgg.OUT))
+
+        # unique accounts of each type across the group of each account's transaction
+        account_groups = groups[columns.account_transactions]
+        accounts_by_type = {}
+        for account_type, mask in columns.account_types.items():
+            group_ids = np.unique(account_groups[mask] * len(columns.keys) + columns.account_ids[mask])
+            accounts_by_type[account_type] = np.bincount(group_ids // max(len(columns.keys), 1), minlength=num_groups)
+
+        return [
+            BlockMetrics(
+                int(transactions[group]),
+                int(votes[group]),
+                int(transactions[group] - only_fees[group]),
+                int(only_fees[group]),
+                int(fees[group]),
+                int(balance_changes[group]),
+                int(accounts_by_type[AccountType.PROGRAM][group]),
+                int(accounts_by_type[AccountType.COIN][group]),
+                int(accounts_by_type[AccountType.TOKEN][group])
+            ) for group in range(num_groups)
+        ]
+
+    @staticmethod
+    def by_success(columns: BlockColumns) -> List[BlockMetrics]:
+        """ Metrics for successful followed by errored transactions. """
+        return BlockMetrics.group_by(columns, (~columns.successful).astype(np.int64), 2)
+
+    @property
+    def row(self) -> List[int]:
+        return [
+            self.transactions,
+            self.votes,
+            self.more_than_fee,
+            self.only_fee,
+            self.fees,
+            self.balance_change,
+            self.program_accounts,
+            self.coin_accounts,
+            self.token_accounts
+        ]
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from abc import abstractmethod
 from functools import reduce, cached_property
-from typing import Dict, List, Set, Optional
+from typing import Dict, Iterator, List, Set, Optional, Tuple
 
 from src.transform.Account import Account
 from src.transform.Accounts import Accounts
@@ -69,11 +69,16 @@ class Instruction:
 
         return self
 
+    def walk(self) -> Iterator[Instruction]:
+        """ Lazily walk this followed by inner instructions in pre-order without copying. """
+        yield self
+        yield from self.inner_instructions.walk()
+
     def flatten(self) -> Instructions:
         """
         Flatten this and any inner into a single collection, new outer instructions will be created without empty inner.
         """
-        return Instructions([self.copy()] + self.inner_instructions.flatten().instructions)
+        return Instructions([instruction.copy() for instruction in self.walk()])
 
     def filter(self, program_name: str, instruction_type: Optional[str]) -> Optional[Instruction]:
         """
@@ -221,6 +226,51 @@ class ParsedInstruction(Instruction):
         )
 
 
+class InstructionIndex:
+    """
+    Parsed instructions at any depth by program name with and without instruction type, built in one walk of the
+    instructions so lookups don't walk or copy them again. Instructions for each key are in the order they appear
+    when flattened.
+    """
+
+    _by_key: Dict[Tuple[str, Optional[str]], List[Instruction]]
+    # keys of outer instructions
+    _outer_keys: Set[Tuple[str, Optional[str]]]
+    # position of each parsed instruction by id when flattened
+    _positions: Dict[int, int]
+
+    @staticmethod
+    def _keys(instruction: Instruction) -> List[Tuple[str, Optional[str]]]:
+        if not isinstance(instruction, ParsedInstruction):
+            return []
+        if instruction.instruction_type is None:
+            return [(instruction.program_name, None)]
+
+        return [(instruction.program_name, None), (instruction.program_name, instruction.instruction_type)]
+
+    def __init__(self, instructions: Instructions):
+        self._by_key = {}
+        self._positions = {}
+        for position, instruction in enumerate(instructions.walk()):
+            for key in InstructionIndex._keys(instruction):
+                self._by_key.setdefault(key, []).append(instruction)
+                self._positions[id(instruction)] = position
+
+        self._outer_keys = {key for instruction in instructions for key in InstructionIndex._keys(instruction)}
+
+    def get(self, program_name: str, instruction_type: Optional[str] = None) -> List[Instruction]:
+        """ Instructions of the program and optional instruction type, shared so shouldn't be modified. """
+        return self._by_key.get((program_name, instruction_type), [])
+
+    def has(self, program_name: str, instruction_type: Optional[str] = None, outer: bool = False) -> bool:
+        """ If there are instructions of the program and optional instruction type, only outer ones if outer. """
+        return (program_name, instruction_type) in (self._outer_keys if outer else self._by_key)
+
+    def position(self, instruction: Instruction) -> int:
+        """ Position of an indexed instruction when flattened. """
+        return self._positions[id(instruction)]
+
+
 class Instructions:
     """
     Some helpers to work on a collection of instructions.
@@ -229,11 +279,14 @@ class Instructions:
     instructions: List[Instruction]
 
     _len: int
+    _index: Optional[InstructionIndex]
 
-    def __init__(self, instructions: List[Instruction]):
+    def __init__(self, instructions: List[Instruction], indexed: bool = False):
+        """ Optionally build the index up front, otherwise it's built on first use. """
         self.instructions = instructions
 
         self._len = sum(map(lambda i: len(i), self.instructions))
+        self._index = InstructionIndex(self) if indexed else None
 
     def __iter__(self):
         return self.instructions.__iter__()
@@ -266,23 +319,45 @@ class Instructions:
             set()
         )
 
+    @property
+    def index(self) -> InstructionIndex:
+        """ Index of parsed instructions at any depth. """
+        if self._index is None:
+            self._index = InstructionIndex(self)
+
+        return self._index
+
     def filter(self, program_name: str, instruction_type: Optional[str] = None, flatten: bool = False) -> Instructions:
         """
         Filter parsed instructions for the given program and instruction type. Outer instructions with child
-        instructions of the given filter will also be returned unless flatten is True.
+        instructions of the given filter will also be returned unless flatten is True, in which case the matching
+        instructions are looked up from the index and returned as is rather than copied.
         """
+        if flatten:
+            return Instructions(self.index.get(program_name, instruction_type))
+
         filtered_instructions = []
-        for instruction in (self.flatten() if flatten else self):
+        for instruction in self:
             filtered_instruction = instruction.filter(program_name, instruction_type)
             if filtered_instruction is not None:
                 filtered_instructions.append(filtered_instruction)
 
         return Instructions(filtered_instructions)
 
-    def flatten(self) -> Instructions:
-        """ Return a flat list of outer and inner instructions. """
-        flattened = Instructions([])
-        for instruction in self.instructions:
-            flattened += instruction.flatten()
+    def walk(self) -> Iterator[Instruction]:
+        """
+        Lazily walk outer and inner instructions in pre-order without copying, keeping a stack of iterators instead of
+        recursing so deep trees don't hit the recursion limit.
+        """
+        stack = [iter(self.instructions)]
+        while len(stack) > 0:
+            instruction = next(stack[-1], None)
+            if instruction is None:
+                stack.pop()
+            else:
+                yield instruction
+                stack.append(iter(instruction.inner_instructions))
 
-        return flattened
+    def flatten(self) -> Instructions:
+        """ Return a flat list of outer and inner instructions, copied without their inner instructions. """
+        return Instructions([instruction.copy() for instruction in self.walk()])
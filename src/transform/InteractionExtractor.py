@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.transform.Instruction import ParsedInstruction
+from src.transform.Interaction import Interaction
+from src.transform.ProgramInstruction import ProgramInstruction
+from src.transform.Transaction import Transaction
+from src.transform.Transfer import CoinTransfer, TokenTransfer
+
+Handler = Callable[[Transaction, ParsedInstruction], Interaction]
+
+
+class InteractionExtractor:
+    """
+    Extract interactions from a transaction by looking up instructions for each registered program and instruction type
+    from its index instead of walking them, dispatching them to the handlers registered for them. Handlers registered
+    for a program without an instruction type get every parsed instruction of the program.
+
+    @author zuyezheng
+    """
+
+    _handlers: Dict[Tuple[str, Optional[str]], List[Handler]]
+
+    @staticmethod
+    def default() -> InteractionExtractor:
+        """ Extractor for coin and token transfers. """
+        return InteractionExtractor() \
+            .register(ProgramInstruction.SYSTEM_TRANSFER, CoinTransfer.from_instruction) \
+            .register(ProgramInstruction.SPL_TRANSFER, TokenTransfer.from_instruction)
+
+    def __init__(self):
+        self._handlers = {}
+
+    def register(self, program_instruction: ProgramInstruction, handler: Handler) -> InteractionExtractor:
+        self._handlers.setdefault(
+            (program_instruction.program_name, program_instruction.instruction_type), []
+        ).append(handler)
+
+        return self
+
+    def extract(self, transaction: Transaction) -> Iterator[Interaction]:
+        """
+        Interactions in the order of their instructions when flattened, with handlers for a program before those for
+        an instruction type of it.
+        """
+        index = transaction.instructions.index
+
+        matched = []
+        for (program_name, instruction_type), handlers in self._handlers.items():
+            for instruction in index.get(program_name, instruction_type):
+                matched.append((index.position(instruction), instruction_type is not None, instruction, handlers))
+
+        for _, _, instruction, handlers in sorted(matched, key=lambda m: m[:2]):
+            for handler in handlers:
+                yield handler(transaction, instruction)
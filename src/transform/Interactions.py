@@ -1,11 +1,9 @@
 from collections import defaultdict
-from functools import partial
-from typing import List, Type, TypeVar
+from typing import Iterable, Iterator, List, Optional, Type, TypeVar
 
 from src.transform.Block import Block
-from src.transform.ProgramInstruction import ProgramInstruction
 from src.transform.Interaction import Interaction
-from src.transform.Transfer import CoinTransfer, TokenTransfer
+from src.transform.InteractionExtractor import InteractionExtractor
 
 
 T = TypeVar('T', bound=Interaction)
@@ -13,39 +11,28 @@ T = TypeVar('T', bound=Interaction)
 
 class Interactions:
     """
-    Form interactions from a list of blocks.
+    Form interactions from blocks, extracted from successful transactions each time they're iterated. Blocks are
+    kept in a list so interactions can be iterated more than once even when given a one shot iterator.
 
     @author zuye.zheng
     """
 
-    interactions: List[Interaction]
+    blocks: List[Block]
+    extractor: InteractionExtractor
 
-    def __init__(self, blocks: List[Block]):
-        self.interactions = []
-        for block in blocks:
-            for transaction in block.transactions.successful:
-                # add coin transfers
-                self.interactions.extend(map(
-                    partial(CoinTransfer.from_instruction, transaction),
-                    ProgramInstruction.SYSTEM_TRANSFER.filter(transaction.instructions, True)
-                ))
-
-                # add token transfers
-                self.interactions.extend(map(
-                    partial(TokenTransfer.from_instruction, transaction),
-                    ProgramInstruction.SPL_TRANSFER.filter(transaction.instructions, True)
-                ))
+    def __init__(self, blocks: Iterable[Block], extractor: Optional[InteractionExtractor] = None):
+        self.blocks = list(blocks)
+        self.extractor = InteractionExtractor.default() if extractor is None else extractor
 
-    def __iter__(self):
-        return self.interactions.__iter__()
-
-    def __len__(self):
-        return len(self.interactions)
+    def __iter__(self) -> Iterator[Interaction]:
+        for block in self.blocks:
+            for transaction in block.transactions.successful:
+                yield from self.extractor.extract(transaction)
 
     def by_type(self) -> dict[Type[T], List[Interaction]]:
         by_type = defaultdict(lambda: [])
 
-        for interaction in self.interactions:
+        for interaction in self:
             by_type[type(interaction)].append(interaction)
 
         return by_type
@@ -28,7 +28,15 @@ class ProgramInstruction(Enum):
         self.instruction_type = instruction_type
 
     def filter(self, instructions: Instructions, flatten: bool = False) -> Instructions:
+        # skip walking and copying the tree if nothing matches at any depth
+        if not self.within(instructions):
+            return Instructions([])
+
         return instructions.filter(self.program_name, self.instruction_type, flatten)
 
+    def within(self, instructions: Instructions) -> bool:
+        """ If there are any matching instructions at any depth. """
+        return instructions.index.has(self.program_name, self.instruction_type)
+
     def of(self, instruction: Instruction) -> bool:
         return instruction.is_of(self.program_name, self.instruction_type)
@@ -13,7 +13,9 @@ from src.transform.NumberWithScale import NumberWithScale
 
 class Transaction:
     """
-    Parse out a transaction and put together some interesting pieces of metadata.
+    Parse out a transaction and put together some interesting pieces of metadata. Parts of the transaction such as
+    accounts, instructions and token balances are only parsed when first used, with fees, balances and instruction
+    checks read straight from the JSON so cheaper transforms never build them.
 
     @author zuyezheng
     """
@@ -22,13 +24,11 @@ class Transaction:
     transaction: Dict[str, any]
     # signatures are an array, but they are unique so the first is sufficient as an identifier.
     signature: str
-    accounts: Accounts
 
     def __init__(self, transaction_meta: Dict[str, any]):
         self.meta = transaction_meta['meta']
         self.transaction = transaction_meta['transaction']
         self.signature = self.transaction['signatures'][0]
-        self.accounts = Accounts.from_json(self.signature, self.transaction['message']['accountKeys'])
 
     def __hash__(self):
         return hash(self.signature)
@@ -62,6 +62,10 @@ class Transaction:
     def signatures(self) -> List[str]:
         return self.transaction['signatures']
 
+    @cached_property
+    def accounts(self) -> Accounts:
+        return Accounts.from_json(self.signature, self.transaction['message']['accountKeys'])
+
     @cached_property
     def instructions(self) -> Instructions:
         """ Construct the list of instructions with any nested inner instructions. """
@@ -78,7 +82,8 @@ class Transaction:
                 self.accounts, instruction, inner_instructions.get(instruction_i)
             ))
 
-        return Instructions(instructions).set_ids()
+        # index while parsing so transforms look up instructions without walking them again
+        return Instructions(instructions, indexed=True).set_ids()
 
     @cached_property
     def account_balance_changes(self) -> Dict[Account, AccountBalanceChange]:
@@ -94,11 +99,12 @@ class Transaction:
 
     def total_account_balance_change(self, agg: BalanceChangeAgg = BalanceChangeAgg.ALL) -> NumberWithScale:
         """ Sum of change of all balances. """
+        # balances line up with accounts so there's no need to build them
         return reduce(
             lambda a, b: a + b,
             map(
-                lambda c: agg(c.change),
-                self.account_balance_changes.values()
+                lambda balances: agg(NumberWithScale.lamports(balances[1] - balances[0])),
+                zip(self.pre_balances(), self.post_balances())
             )
         )
 
@@ -159,9 +165,25 @@ class Transaction:
         """ All token mints in the transaction. """
         return {change.mint for change in self.token_balance_changes.values()}
 
+    @cached_property
+    def program_accounts(self) -> Set[Account]:
+        """ Program accounts across all outer and inner instructions without parsing the instructions. """
+        program_keys = {instruction['programId'] for instruction in self.transaction['message']['instructions']}
+        for inner in self.meta['innerInstructions']:
+            program_keys.update(instruction['programId'] for instruction in inner['instructions'])
+
+        return self.accounts.from_keys(program_keys)
+
+    @property
+    def token_accounts(self) -> Set[Account]:
+        """ Accounts with token balances without computing their changes. """
+        return self.accounts.from_indices(
+            balance['accountIndex'] for balance in self.pre_token_balances() + self.post_token_balances()
+        )
+
     def accounts_by_type(self) -> Dict[AccountType, Set[Account]]:
-        program_accounts = self.instructions.programs
-        token_accounts = set(self.token_balance_changes.keys())
+        program_accounts = self.program_accounts
+        token_accounts = self.token_accounts
         sysvar_accounts = set()
         coin_accounts = set()
 
@@ -173,15 +195,26 @@ class Transaction:
 
         return {
             AccountType.SYSVAR: sysvar_accounts,
-            AccountType.PROGRAM: program_accounts,
+            # copied since the cached set would otherwise be shared with callers that aggregate into it
+            AccountType.PROGRAM: set(program_accounts),
             AccountType.TOKEN: token_accounts,
             AccountType.COIN: coin_accounts
         }
 
     def has_instruction_of(self, program_name: str, instruction_type: Optional[str] = None) -> bool:
-        """ If there are any parsed interactions of the given type. """
-        for instruction in self.instructions:
-            if instruction.is_of(program_name, instruction_type):
+        """
+        If there are any parsed outer instructions of the given type, looked up from the index if instructions were
+        already parsed otherwise checked without parsing them.
+        """
+        if 'instructions' in self.__dict__:
+            return self.instructions.index.has(program_name, instruction_type, outer=True)
+
+        for instruction in self.transaction['message']['instructions']:
+            if 'parsed' not in instruction or instruction['program'] != program_name:
+                continue
+
+            parsed = instruction['parsed']
+            if instruction_type is None or (isinstance(parsed, dict) and parsed['type'] == instruction_type):
                 return True
 
         return False
@@ -0,0 +1,73 @@
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable, List
+
+from src.load.TransformTask import block_info, ResultsAndErrors
+from src.transform.AccountType import AccountType
+from src.transform.BalanceChange import BalanceChangeAgg
+from src.transform.Block import Block
+
+
+def block_info_by_transaction(block: Block) -> ResultsAndErrors:
+    """ BLOCKS aggregated by filtering parsed transactions for each metric, the reference for block_info. """
+    row = [
+        block.epoch,
+        block.hash,
+        str(block.source),
+        len(block.transactions)
+    ]
+
+    for transactions in [block.transactions.successful, block.transactions.errors]:
+        row.extend([
+            len(transactions),
+            len(transactions.votes),
+            len(transactions.more_than_fee),
+            len(transactions.only_fee),
+            transactions.fees,
+            transactions.balance_change(BalanceChangeAgg.OUT).v
+        ])
+
+        accounts_by_type = transactions.accounts_by_type
+        for account_type in [AccountType.PROGRAM, AccountType.COIN, AccountType.TOKEN]:
+            row.append(len(accounts_by_type.get(account_type, [])))
+
+    return [row], []
+
+
+def time_transform(paths: List[Path], transform: Callable[[Block], ResultsAndErrors], repeat: int) -> float:
+    """ Seconds per block to transform, blocks are opened fresh each time and outside of the timing. """
+    elapsed = 0
+    for _ in range(repeat):
+        for path in paths:
+            block = Block.open(path)
+
+            start = time.perf_counter()
+            transform(block)
+            elapsed += time.perf_counter() - start
+
+    return elapsed / (repeat * len(paths))
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the BLOCKS task against aggregating parsed transactions.')
+
+    parser.add_argument('--blocks_dir', type=str, help='Directory of blocks.', default='test/resources/blocks')
+    parser.add_argument('--repeat', type=int, help='Times to transform each block.', default=3)
+
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.blocks_dir).rglob('*.json.gz'))
+    for path in paths:
+        if block_info(Block.open(path)) != block_info_by_transaction(Block.open(path)):
+            raise ValueError(f'BLOCKS output differs for {path}.')
+
+    by_transaction = time_transform(paths, block_info_by_transaction, args.repeat)
+    aggregated = time_transform(paths, block_info, args.repeat)
+    print(f'{len(paths)} blocks, identical output.')
+    print(f'By transaction: {by_transaction * 1000:.1f}ms per block.')
+    print(f'Single pass: {aggregated * 1000:.1f}ms per block, {by_transaction / aggregated:.1f}x faster.')
+
+
+if __name__ == '__main__':
+    main()
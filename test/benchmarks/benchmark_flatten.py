@@ -0,0 +1,69 @@
+import time
+from argparse import ArgumentParser
+from typing import Callable
+
+from src.transform.Account import Account
+from src.transform.Instruction import Instructions, Instruction, PartiallyParsedInstruction
+
+PROGRAM = Account(0, 'program')
+
+
+def tree(depth: int, fanout: int) -> Instruction:
+    """ Synthetic instruction with fanout inner instructions at each level down to depth, built bottom up. """
+    instruction = PartiallyParsedInstruction(set(), PROGRAM, None, '')
+    for _ in range(depth):
+        instruction = PartiallyParsedInstruction(
+            set(), PROGRAM, Instructions([instruction.copy(instruction.inner_instructions) for _ in range(fanout)]), ''
+        )
+
+    return instruction
+
+
+def flatten_by_concatenation(instructions: Instructions) -> Instructions:
+    """ Flatten by concatenating Instructions, the reference for Instructions.flatten. """
+    flattened = Instructions([])
+    for instruction in instructions:
+        flattened += Instructions(
+            [instruction.copy()] + flatten_by_concatenation(instruction.inner_instructions).instructions
+        )
+
+    return flattened
+
+
+def time_flatten(instructions: Instructions, flatten: Callable[[Instructions], any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        flatten(instructions)
+
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark flattening synthetic instruction trees.')
+
+    parser.add_argument('--repeat', type=int, help='Times to flatten each tree.', default=5)
+
+    args = parser.parse_args()
+
+    trees = {
+        # many outer instructions each with a few inner like large DeFi transactions
+        'wide': Instructions([tree(1, 8) for _ in range(1_000)]),
+        'bushy': Instructions([tree(6, 4) for _ in range(4)]),
+        # stays under the recursion limit for the reference
+        'deep': Instructions([tree(300, 1) for _ in range(10)])
+    }
+
+    for name, instructions in trees.items():
+        by_concatenation = time_flatten(instructions, flatten_by_concatenation, args.repeat)
+        flattened = time_flatten(instructions, Instructions.flatten, args.repeat)
+        walked = time_flatten(instructions, lambda i: sum(1 for _ in i.walk()), args.repeat)
+
+        print(
+            f'{name} ({len(instructions)} instructions): concatenation {by_concatenation * 1000:.1f}ms, '
+            f'flatten {flattened * 1000:.1f}ms ({by_concatenation / flattened:.1f}x), '
+            f'walk {walked * 1000:.1f}ms ({by_concatenation / walked:.1f}x).'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, List, Optional
+
+
+class MockRpcError(Exception):
+    """ Raise from a mock method to respond with a JSON-RPC error object. """
+
+    def __init__(self, code: int, message: str):
+        self.code = code
+        self.message = message
+        super().__init__(message)
+
+
+class MockRpcServer:
+    """
+    Local JSON-RPC server for tests with methods implemented as callables of params, supports single and batch
+    requests. Use as a context manager to serve on a random local port.
+    """
+
+    methods: Dict[str, Callable[[List[any]], any]]
+    # list of request payloads received
+    requests: List[any]
+    # number of upcoming requests to reject with the status and the Retry-After to send with them
+    reject: int
+    reject_status: int
+    retry_after: Optional[str]
+    # seconds to wait before responding
+    delay: float
+    # calls to leave out of batch responses
+    drop: Callable[[Dict[str, any]], bool]
+
+    _server: Optional[ThreadingHTTPServer]
+
+    def __init__(self, methods: Dict[str, Callable[[List[any]], any]]):
+        self.methods = methods
+        self.requests = []
+        self.reject = 0
+        self.reject_status = 429
+        self.retry_after = None
+        self.delay = 0
+        self.drop = lambda call: False
+
+        self._server = None
+
+    @property
+    def endpoint(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def respond(self, call: Dict[str, any]) -> Dict[str, any]:
+        response = {'jsonrpc': '2.0', 'id': call['id']}
+        try:
+            response['result'] = self.methods[call['method']](call['params'])
+        except MockRpcError as e:
+            response['error'] = {'code': e.code, 'message': e.message}
+
+        return response
+
+    def __enter__(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+                time.sleep(mock.delay)
+
+                if mock.reject > 0:
+                    mock.reject -= 1
+                    self.send_response(mock.reject_status)
+                    if mock.retry_after is not None:
+                        self.send_header('Retry-After', mock.retry_after)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                mock.requests.append(payload)
+
+                if isinstance(payload, list):
+                    body = [mock.respond(call) for call in payload if not mock.drop(call)]
+                else:
+                    body = mock.respond(payload)
+
+                encoded = json.dumps(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
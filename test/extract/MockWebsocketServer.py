@@ -0,0 +1,70 @@
+import asyncio
+import json
+import threading
+from typing import List, Optional
+
+import websockets
+
+
+class MockWebsocketServer:
+    """
+    Local websocket server for tests that accepts slot and root subscriptions and pushes notifications for slots
+    published to it. Use as a context manager to serve on a random local port.
+    """
+
+    # subscription methods received
+    subscriptions: List[str]
+
+    _loop: asyncio.AbstractEventLoop
+    _server: Optional[websockets.WebSocketServer]
+    _connections: set
+
+    def __init__(self):
+        self.subscriptions = []
+
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._connections = set()
+
+    @property
+    def endpoint(self) -> str:
+        return f'ws://127.0.0.1:{self._server.sockets[0].getsockname()[1]}'
+
+    async def _handle(self, websocket, *args):
+        async for message in websocket:
+            method = json.loads(message)['method']
+            self.subscriptions.append(method)
+            self._connections.add((websocket, method))
+
+    async def _publish(self, slot: int):
+        for websocket, method in list(self._connections):
+            result = slot if method == 'rootSubscribe' else {'parent': slot - 1, 'root': slot - 32, 'slot': slot}
+            notification = 'rootNotification' if method == 'rootSubscribe' else 'slotNotification'
+            await websocket.send(json.dumps({
+                'jsonrpc': '2.0', 'method': notification, 'params': {'result': result, 'subscription': 0}
+            }))
+
+    def publish(self, slot: int):
+        """ Notify all subscribers of a new slot. """
+        asyncio.run_coroutine_threadsafe(self._publish(slot), self._loop).result()
+
+    def __enter__(self):
+        started = threading.Event()
+
+        async def serve():
+            self._server = await websockets.serve(self._handle, '127.0.0.1', 0)
+            started.set()
+
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(serve(), self._loop)
+        started.wait()
+
+        return self
+
+    def __exit__(self, *args):
+        async def stop():
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,20 @@
+import unittest
+
+from src.extract.BlockParams import BlockParams, TransactionDetails
+from src.load.TransformTask import TransformTask
+
+
+class TestBlockParams(unittest.TestCase):
+
+    def test_combine(self):
+        params = BlockParams.combine([
+            BlockParams(TransactionDetails.SIGNATURES, False),
+            BlockParams(TransactionDetails.ACCOUNTS, False)
+        ])
+        self.assertEqual(BlockParams(TransactionDetails.ACCOUNTS, False), params)
+        self.assertEqual({'transactionDetails': 'accounts', 'rewards': False}, params.config())
+
+        self.assertEqual({}, BlockParams.combine([]).config(), 'Everything should be requested by default.')
+
+    def test_tasks(self):
+        self.assertEqual({'rewards': False}, TransformTask.block_params(TransformTask.all()).config())
@@ -0,0 +1,62 @@
+import threading
+import time
+import unittest
+
+from src.extract.BlockWriter import BlockWriter
+
+
+class TestBlockWriter(unittest.TestCase):
+
+    def test_ordered(self):
+        written = []
+
+        def compress(slot: int, block: bytes) -> bytes:
+            # later blocks finish compressing first
+            time.sleep(0.01 * (10 - int(block)))
+            return block
+
+        writer = BlockWriter(lambda slot, compressed: written.append((slot, compressed)), compress, 4)
+        for slot in range(10):
+            writer.submit(slot, str(slot).encode('utf-8'))
+        writer.close()
+
+        self.assertEqual([(slot, str(slot).encode('utf-8')) for slot in range(10)], written)
+
+    def test_backpressure(self):
+        disk = threading.Event()
+        written = []
+
+        def write(slot: int, compressed: bytes):
+            disk.wait()
+            written.append(slot)
+
+        writer = BlockWriter(write, lambda slot, block: block, 2, 2)
+
+        submitted = []
+
+        def submit():
+            for slot in range(10):
+                writer.submit(slot, b'')
+                submitted.append(slot)
+
+        submitting = threading.Thread(target=submit)
+        submitting.start()
+        time.sleep(0.1)
+
+        # one being written and the rest pending
+        self.assertEqual(3, len(submitted), 'Submit should block while the writer is behind.')
+
+        disk.set()
+        submitting.join()
+        writer.close()
+        self.assertEqual(list(range(10)), written, 'Close should flush everything pending.')
+
+    def test_error(self):
+        def write(slot: int, compressed: bytes):
+            raise IOError('Disk full.')
+
+        writer = BlockWriter(write, lambda slot, block: block)
+        writer.submit(0, b'')
+
+        with self.assertRaises(IOError):
+            writer.close()
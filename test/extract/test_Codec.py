@@ -0,0 +1,58 @@
+import gzip
+import json
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.extract.Codec import Codec, Compression
+
+
+class TestCodec(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+    _block: bytes
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            self._block = f.read()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def _train(self) -> Path:
+        # train on transactions since there are only a couple of test blocks
+        transactions = json.loads(self._block)['result']['transactions']
+        dictionary_path = Path(self._output_dir.name, 'blocks.dict')
+        dictionary_path.write_bytes(Codec.train(json.dumps(t).encode('utf-8') for t in transactions))
+
+        return dictionary_path
+
+    def test_compression(self):
+        for codec in [Codec(), Codec(Compression.ZSTD), Codec(Compression.ZSTD, 19)]:
+            with self.subTest(compression=codec.compression, level=codec.level):
+                compressed = codec.compress(self._block)
+                self.assertEqual(codec.compression, Compression.of(compressed))
+                self.assertEqual(self._block, Codec().decompress(compressed), 'Any codec should decompress.')
+
+        self.assertEqual('.json.zst', Codec(Compression.ZSTD).suffix)
+
+    def test_dictionary(self):
+        codec = Codec(Compression.ZSTD, dictionary_path=self._train())
+        compressed = codec.compress(self._block)
+        self.assertLess(len(compressed), len(Codec(Compression.ZSTD).compress(self._block)))
+
+        # save the dictionary to the root of an archive with a block in a subdirectory
+        archive_path = Path(self._output_dir.name, 'archive')
+        codec.save_dictionary(archive_path)
+        block_path = archive_path.joinpath('110130000', f'110130000{codec.suffix}')
+        block_path.parent.mkdir()
+        block_path.write_bytes(compressed)
+
+        self.assertEqual(self._block, Codec.for_block(block_path).read(block_path))
+        self.assertEqual(self._block, pickle.loads(pickle.dumps(Codec.for_archive(archive_path))).read(block_path))
+
+        with self.assertRaises(ValueError, msg='Should fail without the dictionary.'):
+            Codec().read(block_path)
@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.extract.CommitLog import Commit, CommitLog
+
+
+class TestCommitLog(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def test_of(self):
+        self.assertEqual(
+            Commit([[1, 3], [5, 5], [7, 8]], ['a.0.csv']), Commit.of([8, 2, 1, 5, 3, 7, 2], ['a.0.csv'])
+        )
+
+    def test_log(self):
+        path = Path(self._output_dir.name)
+
+        log = CommitLog(path)
+        self.assertIsNone(log.last())
+
+        commits = [Commit([[i * 10, i * 10 + 9]], [f'{i}.csv']) for i in range(5)]
+        for commit in commits:
+            log.append(commit)
+
+        self.assertEqual(commits, CommitLog(path).commits())
+        self.assertEqual(commits[-1], CommitLog(path).last())
+
+        # simulate dying part way through appending a commit
+        with open(log.path, 'a') as f:
+            f.write('{"slots": [[50, ')
+
+        log = CommitLog(path)
+        self.assertEqual(commits[-1], log.last(), 'Partial commits should be dropped.')
+
+        log.append(commits[0])
+        self.assertEqual(commits + [commits[0]], log.commits())
+
+    def test_last_large(self):
+        log = CommitLog(Path(self._output_dir.name))
+        log.READ_SIZE = 16
+
+        commits = [Commit([[i, i]], [f'{i}_{"x" * 40}.csv']) for i in range(3)]
+        for commit in commits:
+            log.append(commit)
+
+        self.assertEqual(commits[-1], log.last(), 'Should find the last commit across reads.')
@@ -0,0 +1,312 @@
+import itertools
+import random
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import Dict, List
+
+from src.extract.Extract import Extract
+from src.extract.RetryQueue import RetryQueue
+from test.extract.MockRpcServer import MockRpcServer, MockRpcError
+from test.extract.MockWebsocketServer import MockWebsocketServer
+
+
+class RecordingExtract(Extract):
+    """ Extract with fake blocks that take a random amount of time to fetch and records processed slots. """
+
+    processed: List[int]
+
+    def __init__(self, output_loc: str, concurrency: int):
+        super().__init__('http://localhost:8899', output_loc, 100, concurrency)
+
+        self.processed = []
+
+    def get_confirmed_slots(self, start: int, end: int) -> List[int]:
+        return list(range(start, end + 1))
+
+    def get_block(self, slot: int):
+        time.sleep(random.random() / 100)
+        return {'result': {'slot': slot}}
+
+    def process_block(self, slot: int, block_json: Dict):
+        self.processed.append(block_json['result']['slot'])
+
+
+class ProcessedExtract(Extract):
+    """ Extract against a real endpoint that records processed slots. """
+
+    processed: List[int]
+
+    def __init__(self, endpoint: str, output_loc: str, concurrency: int, batch_size: int):
+        super().__init__(endpoint, output_loc, 100, concurrency, batch_size)
+
+        self.processed = []
+
+    def process_block(self, slot: int, block_json: Dict):
+        self.processed.append(block_json['result']['slot'])
+
+
+class TestExtract(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def test_ordered(self):
+        extract = RecordingExtract(self._output_dir.name, 8)
+        extract.start(100, 150)
+        self.assertEqual(list(range(100, 151)), extract.processed, 'Blocks should be processed in slot order.')
+
+        # separate output since completed slots would be skipped
+        extract = RecordingExtract(str(Path(self._output_dir.name, 'down')), 8)
+        extract.start(150, 100)
+        self.assertEqual(list(range(150, 99, -1)), extract.processed, 'Count down should also be in order.')
+
+    def test_fetch(self):
+        extract = RecordingExtract(self._output_dir.name, 4)
+        slots = [slot for slot, _ in extract.fetch(range(10))]
+        self.assertEqual(list(range(10)), slots)
+
+        # fewer slots than the window
+        slots = [slot for slot, _ in extract.fetch(range(2))]
+        self.assertEqual([0, 1], slots)
+
+    def test_batch(self):
+        attempts = {}
+
+        def get_block(params):
+            slot = params[0]
+            attempts[slot] = attempts.get(slot, 0) + 1
+
+            if slot == 103:
+                raise MockRpcError(-32007, 'Slot 103 was skipped, or missing due to ledger jump to recent snapshot')
+            if slot == 105 and attempts[slot] == 1:
+                raise MockRpcError(-32004, 'Block not available for slot 105')
+
+            return {'slot': slot}
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': get_block
+        }) as server:
+            extract = ProcessedExtract(server.endpoint, self._output_dir.name, 2, 4)
+            extract._retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 4)
+            extract.start(100, 111)
+
+        self.assertEqual(
+            [100, 101, 102, 104, 106, 107, 108, 109, 110, 111, 105],
+            extract.processed,
+            'Blocks should be mapped back to their slots and in order with the skipped slot dropped.'
+        )
+        self.assertEqual(2, attempts[105], 'Slot not yet available should be retried.')
+        self.assertEqual(1, attempts[103], 'Skipped slot should not be retried.')
+        self.assertEqual(
+            [4, 4, 4],
+            [len(request) for request in server.requests if isinstance(request, list)],
+            'Slots should be requested in batches.'
+        )
+
+    def test_batch_missing(self):
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': lambda params: {'slot': params[0]}
+        }) as server:
+            # the node leaves slot 102 out of the first batch
+            dropped = []
+
+            def drop(call):
+                if call['method'] == 'getBlock' and call['params'][0] == 102 and len(dropped) == 0:
+                    dropped.append(call)
+                    return True
+                return False
+
+            server.drop = drop
+
+            extract = ProcessedExtract(server.endpoint, self._output_dir.name, 1, 4)
+            extract._retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 4)
+            extract.start(100, 107)
+
+        self.assertEqual(1, len(dropped))
+        self.assertEqual(
+            [100, 101, 103, 104, 105, 106, 107, 102],
+            extract.processed,
+            'Slot missing from the batch response should be retried rather than dead lettered.'
+        )
+        self.assertFalse(Path(self._output_dir.name, 'dead_letters.txt').exists())
+
+    def test_skipped(self):
+        skipped = {1_001, 1_002, 1_500, 2_000}
+        requested = []
+
+        def get_block(params):
+            requested.append(params[0])
+            return {'slot': params[0]}
+
+        with MockRpcServer({
+            'getBlocks': lambda params: [s for s in range(params[0], params[1] + 1) if s not in skipped],
+            'getBlock': get_block
+        }) as server:
+            extract = ProcessedExtract(server.endpoint, self._output_dir.name, 4, 1)
+            extract.start(2_100, 900)
+
+        expected = [s for s in range(2_100, 899, -1) if s not in skipped]
+        self.assertEqual(expected, extract.processed, 'Only confirmed blocks should be processed counting down.')
+        self.assertEqual(set(expected), set(requested), 'Skipped slots should never be requested.')
+
+        with open(Path(self._output_dir.name, 'skipped_slots.txt')) as f:
+            self.assertEqual(skipped, set(map(int, f.read().split())))
+
+    def test_skipped_resume(self):
+        skipped = {1_001, 1_002, 1_500, 2_000}
+
+        with MockRpcServer({
+            'getBlocks': lambda params: [s for s in range(params[0], params[1] + 1) if s not in skipped],
+            'getBlock': lambda params: {'slot': params[0]}
+        }) as server:
+            # stop part way through a chunk and resume over the whole range
+            ProcessedExtract(server.endpoint, self._output_dir.name, 4, 1).start(900, 1_600)
+            ProcessedExtract(server.endpoint, self._output_dir.name, 4, 1).start(900, 2_100)
+
+        with open(Path(self._output_dir.name, 'skipped_slots.txt')) as f:
+            self.assertEqual(sorted(skipped), sorted(map(int, f.read().split())), 'Skipped slots should be unique.')
+
+    def test_past_tip(self):
+        tip = [105]
+
+        def get_block(params):
+            # the chain catches up once slots past the tip are requested
+            if params[0] > tip[0]:
+                tip[0] = 110
+                raise MockRpcError(-32004, f'Block not available for slot {params[0]}')
+            return {'slot': params[0]}
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], min(params[1], tip[0]) + 1)),
+            'getBlock': get_block
+        }) as server:
+            extract = ProcessedExtract(server.endpoint, self._output_dir.name, 1, 1)
+            extract._retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 4)
+            extract.start(100, 110)
+
+        self.assertEqual(list(range(100, 111)), sorted(extract.processed), 'Slots past the tip should be retried.')
+        self.assertFalse(Path(self._output_dir.name, 'skipped_slots.txt').exists(), 'Nothing should be skipped.')
+
+    def test_retries(self):
+        attempts = {}
+
+        def get_block(params):
+            slot = params[0]
+            attempts[slot] = attempts.get(slot, 0) + 1
+
+            if slot == 3 and attempts[slot] < 3:
+                raise MockRpcError(-32004, 'Block not available for slot 3')
+            if slot == 5:
+                raise MockRpcError(-32004, 'Block not available for slot 5')
+            if slot == 7:
+                raise MockRpcError(-32009, 'Slot 7 was skipped, or missing in long-term storage')
+
+            return {'slot': slot}
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': get_block
+        }) as server:
+            extract = ProcessedExtract(server.endpoint, self._output_dir.name, 2, 1)
+            extract._retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 4)
+            extract.start(0, 9)
+
+        self.assertEqual(
+            [0, 1, 2, 4, 6, 8, 9, 3],
+            extract.processed,
+            'Newer slots should keep flowing with the retried slot processed once it succeeds.'
+        )
+        self.assertEqual(4, attempts[5], 'Should retry up to max attempts.')
+        self.assertEqual(1, attempts[7], 'Should not retry a slot that will never succeed.')
+
+        with open(Path(self._output_dir.name, 'dead_letters.txt')) as f:
+            self.assertEqual({5, 7}, {int(line.split('\t')[0]) for line in f})
+
+    def test_resume(self):
+        requested = []
+        enumerated = []
+
+        def get_blocks(params):
+            enumerated.append(params)
+            return list(range(params[0], params[1] + 1))
+
+        def get_block(params):
+            requested.append(params[0])
+            return {'slot': params[0]}
+
+        with MockRpcServer({'getBlocks': get_blocks, 'getBlock': get_block}) as server:
+            ProcessedExtract(server.endpoint, self._output_dir.name, 2, 1).start(0, 999)
+            ProcessedExtract(server.endpoint, self._output_dir.name, 2, 1).start(0, 1_009)
+
+        self.assertEqual(
+            list(range(1_010)), sorted(requested), 'Slots completed in an earlier run should not be fetched.'
+        )
+        self.assertEqual([[0, 999], [1_000, 1_009]], enumerated, 'Completed chunks should not be enumerated.')
+
+    def test_tail(self):
+        tip = 104
+
+        with MockRpcServer({
+            'getBlocks': lambda params: [s for s in range(params[0], min(params[1], tip) + 1) if s != 103],
+            'getBlock': lambda params: {'slot': params[0]},
+            'getSlot': lambda params: tip
+        }) as server, MockWebsocketServer() as websocket:
+            extract = ProcessedExtract(server.endpoint, self._output_dir.name, 1, 1)
+            extract.websocket_endpoint = websocket.endpoint
+
+            slots = extract.slots(100, None)
+            tail = extract.fetch(slots)
+
+            def publish_once_subscribed():
+                while 'rootSubscribe' not in websocket.subscriptions:
+                    time.sleep(0.01)
+                websocket.publish(tip)
+
+            threading.Thread(target=publish_once_subscribed).start()
+            self.assertEqual([100, 101, 102, 104], [slot for slot, _ in itertools.islice(tail, 4)])
+
+            tip = 105
+            published = time.perf_counter()
+            websocket.publish(tip)
+            self.assertEqual(105, next(tail)[0])
+            self.assertLess(time.perf_counter() - published, 0.5, 'Should fetch as soon as the tip moves.')
+
+            tail.close()
+            slots.close()
+
+        with open(Path(self._output_dir.name, 'skipped_slots.txt')) as f:
+            self.assertEqual([103], list(map(int, f.read().split())))
+
+    def test_throttled(self):
+        request_times = []
+
+        def get_block(params):
+            request_times.append(time.perf_counter())
+            return {'slot': params[0]}
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': get_block
+        }) as server:
+            extract = ProcessedExtract(server.endpoint, self._output_dir.name, 4, 1)
+            extract._retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 4)
+
+            # throttle enumerating slots
+            server.reject = 1
+            server.retry_after = '0.5'
+            start = time.perf_counter()
+            extract.start(0, 9)
+
+        self.assertEqual(list(range(10)), extract.processed)
+        self.assertGreaterEqual(min(request_times) - start, 0.5, 'Should wait for retry after before any more calls.')
+        self.assertIsNotNone(extract._pool.endpoints[0].limiter.rate, 'Should start limiting once throttled.')
@@ -0,0 +1,92 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.extract.Codec import Codec, Compression
+from src.extract.ExtractBatch import ExtractBatch
+from src.extract.JsonRpc import JsonRpc
+from src.extract.Segment import Segment
+from src.transform.Block import Block
+from test.extract.MockRpcServer import MockRpcServer, MockRpcError
+
+
+class TestExtractBatch(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def test_raw_error(self):
+        error = {'code': -32004, 'message': 'Block not available for slot 1'}
+        self.assertEqual(
+            error, JsonRpc.raw_error(json.dumps({'jsonrpc': '2.0', 'error': error, 'id': 1}).encode('utf-8'))
+        )
+        self.assertIsNone(JsonRpc.raw_error(b'{"jsonrpc":"2.0","result":null,"id":1}'))
+
+        # large results shouldn't need to be decoded
+        body = b'{"jsonrpc":"2.0","result":{"blockhash":"' + b'x' * JsonRpc.RAW_DECODE_SIZE
+        self.assertIsNone(JsonRpc.raw_error(body))
+
+    def test_raw(self):
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            block = json.load(f)
+
+        def get_block(params):
+            if params[0] == 110_130_001:
+                raise MockRpcError(-32007, 'Slot 110130001 was skipped, or missing due to ledger jump')
+
+            return block['result']
+
+        for segments in [False, True]:
+            with self.subTest(segments=segments), tempfile.TemporaryDirectory() as output_dir:
+                with MockRpcServer({
+                    'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+                    'getBlock': get_block
+                }) as server:
+                    extract = ExtractBatch(server.endpoint, output_dir, 10_000, 2, segments=segments, raw=True)
+                    extract.start(110_130_000, 110_130_002)
+
+                if segments:
+                    segment = Segment(Path(output_dir, '110130000.seg'))
+                    self.assertEqual([110_130_000, 110_130_002], segment.slots(), 'Errors should not be archived.')
+                    blocks = [Block.open(segment.path, slot) for slot in segment.slots()]
+                else:
+                    paths = sorted(Path(output_dir, '110130000').iterdir())
+                    self.assertEqual(['110130000.json.gz', '110130002.json.gz'], [p.name for p in paths])
+                    blocks = list(map(Block.open, paths))
+
+                self.assertEqual([3439, 3439], [len(b.transactions) for b in blocks])
+
+                with open(Path(output_dir, 'skipped_slots.txt')) as f:
+                    self.assertEqual([110_130_001], list(map(int, f.read().split())))
+
+    def test_zstd(self):
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            block = json.load(f)
+
+        dictionary_path = Path(self._output_dir.name, 'blocks.dict')
+        dictionary_path.write_bytes(Codec.train(json.dumps(t).encode('utf-8') for t in block['result']['transactions']))
+
+        output_path = Path(self._output_dir.name, 'archive')
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': lambda params: block['result']
+        }) as server:
+            extract = ExtractBatch(
+                server.endpoint,
+                str(output_path),
+                10_000,
+                segments=True,
+                compression=Compression.ZSTD,
+                dictionary_path=dictionary_path
+            )
+            extract.start(110_130_000, 110_130_001)
+
+        self.assertEqual(1, len(list(output_path.glob(f'*{Codec.DICTIONARY_SUFFIX}'))), 'Dictionary should be saved.')
+        self.assertEqual(3439, len(Block.open(output_path.joinpath('110130000.seg'), 110_130_001).transactions))
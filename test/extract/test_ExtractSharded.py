@@ -0,0 +1,156 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from argparse import ArgumentParser
+from pathlib import Path
+from unittest import mock
+
+from src.extract.ExtractBatch import ExtractBatch
+from src.extract.ExtractSharded import ExtractSharded
+from test.extract.MockRpcServer import MockRpcServer, MockRpcError
+
+
+class TestExtractSharded(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def _sharded(self, endpoint: str, processes: int = 1) -> ExtractSharded:
+        parser = ArgumentParser()
+        ExtractBatch.add_arguments(parser)
+        args = parser.parse_args(['--endpoint', endpoint, '--slots_per_dir', '10', '--segments'])
+
+        manifest_dir = str(Path(self._output_dir.name, 'manifest'))
+        return ExtractSharded(manifest_dir, str(Path(self._output_dir.name, 'blocks')), args, 20, processes)
+
+    def test_shards(self):
+        sharded = self._sharded('http://localhost:8899')
+        self.assertEqual([range(5, 20), range(20, 40), range(40, 46)], sharded.shards(5, 45))
+        self.assertEqual([range(40, 46), range(20, 40), range(5, 20)], sharded.shards(45, 5))
+
+    def test_start(self):
+        def get_block(params):
+            if params[0] == 25:
+                raise MockRpcError(-32009, 'Slot 25 was skipped, or missing in long-term storage')
+            return {'slot': params[0]}
+
+        with MockRpcServer({
+            'getBlocks': lambda params: [s for s in range(params[0], params[1] + 1) if s != 45],
+            'getBlock': get_block
+        }) as server:
+            sharded = self._sharded(server.endpoint, 2)
+            # don't wait long on shards claimed by the other worker
+            sharded.HEARTBEAT = 0.05
+            self.assertEqual(3, sharded.start(0, 59))
+            self.assertEqual(0, self._sharded(server.endpoint, 2).start(0, 59), 'Completed shards should be skipped.')
+
+        blocks_path = Path(self._output_dir.name, 'blocks')
+        self.assertEqual(
+            [f'{chunk}.seg' for chunk in range(0, 60, 10)],
+            sorted((p.name for p in blocks_path.glob('*.seg')), key=lambda name: int(name.split('.')[0])),
+            'Shards should be merged into the slots_per_dir layout.'
+        )
+
+        # progress stays with each shard
+        manifest_path = Path(self._output_dir.name, 'manifest')
+        self.assertTrue(manifest_path.joinpath('20_39', 'manifest.json').exists())
+        self.assertEqual(3, len(list(manifest_path.glob('*.done'))))
+
+        # dead letters are moved to the output where they can be replayed
+        self.assertFalse(manifest_path.joinpath('20_39', 'dead_letters.txt').exists())
+        with open(blocks_path.joinpath('dead_letters.txt')) as f:
+            self.assertEqual([25], [int(line.split('\t')[0]) for line in f])
+        self.assertFalse(manifest_path.joinpath('40_59', 'skipped_slots.txt').exists())
+        with open(blocks_path.joinpath('skipped_slots.txt')) as f:
+            self.assertEqual([45], [int(line) for line in f])
+
+    def test_dead_worker(self):
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': lambda params: {'slot': params[0]}
+        }) as server:
+            sharded = self._sharded(server.endpoint)
+            sharded.HEARTBEAT = 0.05
+            sharded.STALE_CLAIM = 0.2
+            sharded.manifest_path.mkdir()
+
+            # a worker died holding the first shard after this one had already passed it
+            sharded.manifest_path.joinpath(f'0_19{ExtractSharded.CLAIM_SUFFIX}').write_text('dead')
+
+            self.assertEqual(2, sharded.work(0, 39), 'Should wait for the stale claim and take it over.')
+
+        self.assertTrue(sharded.manifest_path.joinpath(f'0_19{ExtractSharded.DONE_SUFFIX}').exists())
+
+    def test_claim(self):
+        sharded = self._sharded('http://localhost:8899')
+        sharded.manifest_path.mkdir()
+
+        token = sharded.claim(range(0, 20))
+        self.assertIsNotNone(token)
+        self.assertIsNone(sharded.claim(range(0, 20)), 'Should not claim a shard that is already claimed.')
+
+        # claims without a heartbeat can be taken over
+        claim_path = sharded.manifest_path.joinpath(f'0_19{ExtractSharded.CLAIM_SUFFIX}')
+        stale = time.time() - ExtractSharded.STALE_CLAIM - 1
+        os.utime(claim_path, (stale, stale))
+        new_token = sharded.claim(range(0, 20))
+        self.assertIsNotNone(new_token)
+        self.assertTrue(ExtractSharded.owns(claim_path, new_token))
+        self.assertFalse(ExtractSharded.owns(claim_path, token), 'Original owner should lose the claim.')
+
+    def test_claim_race(self):
+        sharded = self._sharded('http://localhost:8899')
+        sharded.manifest_path.mkdir()
+
+        claim_path = sharded.manifest_path.joinpath(f'0_19{ExtractSharded.CLAIM_SUFFIX}')
+        claim_path.write_text('dead')
+        stale = time.time() - ExtractSharded.STALE_CLAIM - 1
+        os.utime(claim_path, (stale, stale))
+
+        # another worker takes over the stale claim after it was seen as stale but before it's moved aside
+        rename = os.rename
+
+        def take_over_then_rename(source, destination):
+            rename(claim_path, claim_path.with_name('taken'))
+            claim_path.write_text('other')
+            rename(source, destination)
+
+        with mock.patch('src.extract.ExtractSharded.os.rename', take_over_then_rename):
+            self.assertIsNone(sharded.claim(range(0, 20)))
+
+        self.assertEqual('other', claim_path.read_text(), 'Fresh claim of the other worker should be put back.')
+        self.assertEqual([], list(sharded.manifest_path.glob('*.stale.*')))
+
+    def test_lost_claim(self):
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': lambda params: {'slot': params[0]}
+        }) as server:
+            sharded = self._sharded(server.endpoint)
+            sharded.HEARTBEAT = 0.01
+            sharded.manifest_path.mkdir()
+            server.delay = 0.05
+
+            # another worker takes over the claim while the shard is being extracted
+            token = sharded.claim(range(0, 20))
+            claim_path = sharded.manifest_path.joinpath(f'0_19{ExtractSharded.CLAIM_SUFFIX}')
+            claim_path.write_text('other')
+
+            self.assertFalse(sharded.extract_shard(range(0, 20), True, token))
+
+        self.assertEqual('other', claim_path.read_text(), 'Claim of the new owner should be left alone.')
+        self.assertFalse(sharded.manifest_path.joinpath(f'0_19{ExtractSharded.DONE_SUFFIX}').exists())
+        self.assertFalse(Path(self._output_dir.name, 'blocks').exists(), 'Abandoned shard should not be merged.')
+
+        # heartbeat stops on a missing claim instead of raising
+        claim_path.unlink()
+        extract = ExtractBatch.from_args(str(sharded.manifest_path.joinpath('0_19')), sharded.extract_args)
+        sharded._heartbeat(claim_path, token, threading.Event(), extract)
+        self.assertTrue(extract._stopped.is_set())
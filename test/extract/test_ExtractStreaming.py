@@ -0,0 +1,211 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import fastparquet
+import pandas
+
+from src.extract.ExtractStreaming import ExtractStreaming
+from src.load.FileOutput import FileOutputFormat
+from src.load.TransformTask import TransformTask
+from src.transform.Block import Block
+from test.extract.MockRpcServer import MockRpcServer
+
+
+class TestExtractStreaming(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def _read_csvs(self, name: str, output_dir: str = None) -> pandas.DataFrame:
+        paths = sorted(
+            Path(self._output_dir.name if output_dir is None else output_dir).glob(f'110130000_{name}.*.csv'),
+            key=lambda p: int(p.name.split('.')[1])
+        )
+        return pandas.concat([pandas.read_csv(path) for path in paths], ignore_index=True)
+
+    def test_resume(self):
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            block = json.load(f)
+
+        requested = []
+
+        def get_block(params):
+            requested.append(params[0])
+            return block['result']
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': get_block
+        }) as server:
+            extract = ExtractStreaming(server.endpoint, self._output_dir.name, 10_000, {TransformTask.TRANSFERS})
+            extract.start(110_130_000, 110_130_001)
+
+            # simulate dying with rows staged for slots that were never committed
+            staged_path = Path(self._output_dir.name, '110130000_transfers.1.csv.inprogress')
+            staged_path.write_text('partial,row\n')
+
+            extract = ExtractStreaming(server.endpoint, self._output_dir.name, 10_000, {TransformTask.TRANSFERS})
+            self.assertFalse(staged_path.exists(), 'Uncommitted rows should be discarded.')
+            extract.start(110_130_000, 110_130_002)
+
+            # simulate dying after logging a commit but before its files are moved into place
+            extract = ExtractStreaming(server.endpoint, self._output_dir.name, 10_000, {TransformTask.TRANSFERS})
+
+            def fail():
+                raise OSError('Died.')
+
+            extract._writer.commit = fail
+            with self.assertRaises(OSError):
+                extract.start(110_130_000, 110_130_003)
+
+            extract = ExtractStreaming(server.endpoint, self._output_dir.name, 10_000, {TransformTask.TRANSFERS})
+            extract.start(110_130_000, 110_130_003)
+
+        self.assertEqual(
+            [110_130_000, 110_130_001, 110_130_002, 110_130_003],
+            requested,
+            'Committed slots should not be fetched again.'
+        )
+        self.assertEqual(
+            {'encoding': 'jsonParsed', 'rewards': False},
+            next(r['params'][1] for r in server.requests if r['method'] == 'getBlock'),
+            'Should only request what the tasks need.'
+        )
+        self.assertEqual((394 * 4, 9), self._read_csvs('transfers').shape, 'Rows should not be duplicated.')
+        self.assertEqual([], list(Path(self._output_dir.name).glob('*.inprogress')))
+
+    def test_merge_parts(self):
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            block = json.load(f)
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': lambda params: block['result']
+        }) as server:
+            extract = ExtractStreaming(
+                server.endpoint, self._output_dir.name, 2, {TransformTask.TRANSFERS}, commit_interval=0
+            )
+            # commit after every block
+            extract.CHECKPOINT_INTERVAL = 0
+
+            # simulate dying after logging the merge of the second chunk but before its parts are replaced
+            commit = extract._writer.commit
+
+            def fail_merge():
+                if any(p.name.startswith('110130002') for p in extract._writer._replaced):
+                    raise OSError('Died.')
+                commit()
+
+            extract._writer.commit = fail_merge
+            with self.assertRaises(OSError):
+                extract.start(110_130_000, 110_130_003)
+            self.assertEqual(
+                ['110130002_transfers.0.csv', '110130002_transfers.1.csv'],
+                sorted(p.name for p in Path(self._output_dir.name).glob('110130002_*.csv')),
+                'Rows should be committed before merging.'
+            )
+
+            ExtractStreaming(server.endpoint, self._output_dir.name, 2, {TransformTask.TRANSFERS})
+
+        self.assertEqual(
+            ['110130000_transfers.0.csv', '110130002_transfers.0.csv'],
+            sorted(p.name for p in Path(self._output_dir.name).glob('*.csv')),
+            'Parts of each chunk should be merged.'
+        )
+        for chunk in ['110130000', '110130002']:
+            self.assertEqual(
+                (394 * 2, 9),
+                pandas.read_csv(Path(self._output_dir.name, f'{chunk}_transfers.0.csv')).shape,
+                'Merged parts should have rows of every part once.'
+            )
+        self.assertEqual([], list(Path(self._output_dir.name).glob('*.inprogress')))
+
+    def test_archive(self):
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            block = json.load(f)
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': lambda params: block['result']
+        }) as server:
+            archive_path = Path(self._output_dir.name, 'archive')
+            extract = ExtractStreaming(
+                server.endpoint,
+                self._output_dir.name,
+                10_000,
+                {TransformTask.TRANSFERS},
+                archive_loc=str(archive_path)
+            )
+            extract.start(110_130_000, 110_130_001)
+
+        self.assertEqual(
+            {'encoding': 'jsonParsed'},
+            next(r['params'][1] for r in server.requests if r['method'] == 'getBlock'),
+            'Should request full blocks to archive.'
+        )
+        self.assertEqual(2, len([r for r in server.requests if r['method'] == 'getBlock']), 'Should fetch once.')
+
+        for slot in [110_130_000, 110_130_001]:
+            archived = Block.open(archive_path.joinpath('110130000', f'{slot}.json.gz'))
+            self.assertEqual(len(block['result']['transactions']), len(archived.transactions))
+        self.assertEqual(
+            (394 * 2, 9),
+            self._read_csvs('transfers').shape,
+            'Should still stream transforms.'
+        )
+
+    def test_transform_processes(self):
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            block = json.load(f)
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': lambda params: block['result']
+        }) as server:
+            for name, processes in [('inline', 0), ('processes', 2)]:
+                ExtractStreaming(
+                    server.endpoint,
+                    str(Path(self._output_dir.name, name)),
+                    10_000,
+                    {TransformTask.TRANSFERS, TransformTask.BLOCKS},
+                    concurrency=4,
+                    transform_processes=processes
+                ).start(110_130_000, 110_130_004)
+
+        for name in ['transfers', 'blocks']:
+            self.assertTrue(
+                self._read_csvs(name, str(Path(self._output_dir.name, 'inline'))).equals(
+                    self._read_csvs(name, str(Path(self._output_dir.name, 'processes')))
+                ),
+                'Rows should be written in slot order regardless of which process transformed them.'
+            )
+
+    def test_parquet(self):
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            block = json.load(f)
+
+        with MockRpcServer({
+            'getBlocks': lambda params: list(range(params[0], params[1] + 1)),
+            'getBlock': lambda params: block['result']
+        }) as server:
+            ExtractStreaming(
+                server.endpoint,
+                self._output_dir.name,
+                10_000,
+                {TransformTask.TRANSFERS},
+                output_format=FileOutputFormat.PARQUET
+            ).start(110_130_000, 110_130_001)
+
+        self.assertEqual([], list(Path(self._output_dir.name).glob('*.inprogress')), 'Files should be complete.')
+        self.assertEqual(
+            394 * 2,
+            fastparquet.ParquetFile(str(Path(self._output_dir.name, '110130000_transfers.0.parquet'))).count()
+        )
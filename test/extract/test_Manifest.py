@@ -0,0 +1,47 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.extract.Manifest import Manifest
+
+
+class TestManifest(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def test_ranges(self):
+        manifest = Manifest(Path(self._output_dir.name), 100)
+        for slot in [5, 3, 4, 10, 8, 9, 1]:
+            manifest.add(slot)
+
+        self.assertEqual([[1, 1], [3, 5], [8, 10]], manifest.ranges())
+
+        manifest.add(2)
+        manifest.add_range(6, 7)
+        self.assertEqual([[1, 10]], manifest.ranges(), 'Adjacent ranges should merge.')
+
+        # ranges are split by chunk
+        manifest.add_range(95, 205)
+        self.assertEqual([[1, 10], [95, 99], [100, 199], [200, 205]], manifest.ranges())
+        self.assertEqual(10 + 111, len(manifest))
+
+        self.assertIn(150, manifest)
+        self.assertNotIn(50, manifest)
+        self.assertNotIn(206, manifest)
+        self.assertTrue(manifest.covers(95, 205))
+        self.assertFalse(manifest.covers(5, 205))
+
+    def test_checkpoint(self):
+        manifest = Manifest(Path(self._output_dir.name), 100)
+        manifest.add_range(0, 150)
+        manifest.save()
+
+        manifest = Manifest(Path(self._output_dir.name), 1_000)
+        self.assertTrue(manifest.covers(0, 150))
+        self.assertNotIn(151, manifest)
@@ -0,0 +1,55 @@
+import time
+import unittest
+from email.utils import formatdate
+
+from src.extract.RateLimiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_rate(self):
+        limiter = RateLimiter(20)
+
+        start = time.perf_counter()
+        for _ in range(21):
+            limiter.acquire()
+
+        # first token is free, the rest at the rate
+        self.assertAlmostEqual(1, time.perf_counter() - start, 1)
+
+    def test_throttled(self):
+        limiter = RateLimiter()
+        for _ in range(10):
+            limiter.acquire()
+
+        limiter.throttled(0.3)
+        self.assertEqual(5, limiter.rate, 'Should start limiting at half the recent rate.')
+
+        start = time.perf_counter()
+        limiter.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.25, 'Should wait out the retry after.')
+
+    def test_aimd(self):
+        limiter = RateLimiter(10, 12)
+
+        for _ in range(100):
+            limiter.succeeded(0.1)
+        self.assertEqual(12, limiter.rate, 'Rate should increase up to the max.')
+
+        limiter.failed()
+        self.assertEqual(6, limiter.rate, 'Rate should be cut on failures.')
+        limiter.failed()
+        self.assertEqual(6, limiter.rate, 'Failures from the same burst should only decrease once.')
+
+        limiter = RateLimiter(10)
+        limiter.succeeded(0.1)
+        for _ in range(30):
+            limiter.succeeded(1)
+        self.assertLess(limiter.rate, 6, 'Latency creeping up should decrease the rate.')
+
+    def test_retry_after(self):
+        self.assertEqual(3, RateLimiter.retry_after({'Retry-After': '3'}))
+        self.assertIsNone(RateLimiter.retry_after({}))
+        self.assertAlmostEqual(
+            10, RateLimiter.retry_after({'Retry-After': formatdate(time.time() + 10, usegmt=True)}), delta=1
+        )
@@ -0,0 +1,56 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from src.extract.RetryQueue import RetryQueue
+
+
+class TestRetryQueue(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def test_backoff(self):
+        retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 3)
+
+        retries.failed(5, Exception('first'))
+        self.assertEqual([], retries.due(), 'Should not be due until waited.')
+        time.sleep(0.06)
+        self.assertEqual([5], retries.due())
+        self.assertEqual([], retries.due(), 'In flight slots should not be handed out again.')
+
+        retries.failed(5, Exception('second'))
+        self.assertAlmostEqual(0.1, retries.next_due(), 1, 'Wait should double up to the max.')
+
+        retries.failed(5, Exception('third'))
+        self.assertNotIn(5, retries, 'Should be dead lettered after max attempts.')
+        with open(retries.dead_letter_path) as f:
+            self.assertEqual(['5'], [line.split('\t')[0] for line in f])
+
+    def test_persisted(self):
+        retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 3)
+        retries.failed(1, Exception('first'))
+        retries.failed(2, Exception('first'))
+        retries.dead_letter(3, Exception('never'))
+        retries.due()
+        retries.save(True)
+
+        # picked up by the next run with in flight retries due immediately
+        retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 3)
+        self.assertEqual(2, len(retries))
+        time.sleep(0.06)
+        self.assertEqual([1, 2], retries.due())
+
+        retries.succeeded(1)
+        retries.replay_dead_letters()
+        self.assertFalse(retries.dead_letter_path.exists())
+        self.assertEqual([3], retries.due())
+
+        retries = RetryQueue(Path(self._output_dir.name), 0.05, 0.1, 3)
+        self.assertEqual({2, 3}, {slot for slot in [2, 3] if slot in retries})
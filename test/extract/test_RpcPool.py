@@ -0,0 +1,50 @@
+import unittest
+from collections import Counter
+
+from src.extract.RpcPool import RpcPool
+from test.extract.MockRpcServer import MockRpcServer
+
+
+class TestRpcPool(unittest.TestCase):
+
+    @staticmethod
+    def _slot(endpoint) -> int:
+        return endpoint.rpc.result('getSlot')
+
+    def test_latency_routing(self):
+        with MockRpcServer({'getSlot': lambda params: 1}) as slow, MockRpcServer({'getSlot': lambda params: 2}) as fast:
+            slow.delay = 0.05
+            pool = RpcPool([slow.endpoint, fast.endpoint], explore=0)
+
+            counts = Counter(pool.call(self._slot) for _ in range(50))
+
+        self.assertLessEqual(counts[1], 2, 'Should only try the slow endpoint until it has stats.')
+        self.assertGreaterEqual(counts[2], 48)
+
+    def test_failover(self):
+        with MockRpcServer({'getSlot': lambda params: 1}) as bad, MockRpcServer({'getSlot': lambda params: 2}) as good:
+            bad.reject = 1_000
+            bad.reject_status = 500
+            pool = RpcPool([bad.endpoint, good.endpoint], explore=0.5)
+
+            results = [pool.call(self._slot) for _ in range(50)]
+
+        self.assertEqual([2] * 50, results, 'Failed calls should fail over to the healthy endpoint.')
+        self.assertEqual(3, pool.endpoints[0].calls, 'Circuit should open after consecutive failures.')
+        self.assertTrue(pool.endpoints[0].is_open)
+        self.assertIn('circuit open', str(pool))
+
+    def test_recovery(self):
+        with MockRpcServer({'getSlot': lambda params: 1}) as flaky:
+            pool = RpcPool([flaky.endpoint], explore=0)
+
+            flaky.reject = 3
+            flaky.reject_status = 503
+            for _ in range(3):
+                with self.assertRaises(Exception):
+                    pool.call(self._slot)
+            self.assertTrue(pool.endpoints[0].is_open)
+
+            # with every circuit open the best endpoint is still tried and closes once it succeeds
+            self.assertEqual(1, pool.call(self._slot))
+            self.assertFalse(pool.endpoints[0].is_open)
@@ -0,0 +1,62 @@
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.extract.Segment import Segment
+from src.transform.Block import Block
+
+
+class TestSegment(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def test_append_and_read(self):
+        with gzip.open('resources/blocks/110130000/110130000.json.gz') as f:
+            block = f.read()
+
+        path = Segment.path_for(Path(self._output_dir.name), 110_130_005, 10_000)
+        self.assertEqual('110130000.seg', path.name)
+
+        with Segment(path) as segment:
+            for slot in [110_130_002, 110_130_000, 110_130_001]:
+                segment.append(slot, block if slot == 110_130_000 else f'{{"slot": {slot}}}'.encode('utf-8'))
+
+        segment = Segment(path)
+        self.assertEqual([110_130_000, 110_130_001, 110_130_002], segment.slots())
+        self.assertEqual(b'{"slot": 110130001}', segment.read(110_130_001))
+        self.assertEqual(block, segment.read(110_130_000))
+
+        # blocks should open directly from the segment
+        self.assertEqual(3439, len(Block.open(path, 110_130_000).transactions))
+        self.assertEqual([path], Segment.find(Path(self._output_dir.name)))
+
+    def test_torn_append(self):
+        path = Path(self._output_dir.name, '0.seg')
+        with Segment(path) as segment:
+            segment.append(1, b'one')
+            segment.append(2, b'two')
+
+        # simulate a crash part way through writing a block and its index entry
+        with open(path, 'ab') as f:
+            f.write(b'partial block')
+        with open(segment.index_path, 'ab') as f:
+            f.write(b'partial')
+
+        segment = Segment(path)
+        self.assertEqual([1, 2], segment.slots(), 'Torn index entries should be ignored.')
+
+        with segment:
+            segment.append(3, b'three')
+            segment.append(1, b'one again')
+
+        segment = Segment(path)
+        self.assertEqual([1, 2, 3], segment.slots())
+        self.assertEqual(b'three', segment.read(3), 'Torn blocks should be truncated before appending.')
+        self.assertEqual(b'one again', segment.read(1), 'Later appends should replace earlier ones.')
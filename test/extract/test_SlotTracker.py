@@ -0,0 +1,46 @@
+import time
+import unittest
+
+from src.extract.SlotTracker import SlotTracker
+from test.extract.MockWebsocketServer import MockWebsocketServer
+
+
+class TestSlotTracker(unittest.TestCase):
+
+    def test_websocket_for(self):
+        self.assertEqual('ws://localhost:8900', SlotTracker.websocket_for('http://localhost:8899'))
+        self.assertEqual(
+            'wss://api.mainnet-beta.solana.com', SlotTracker.websocket_for('https://api.mainnet-beta.solana.com')
+        )
+
+    def test_subscribe(self):
+        polls = []
+
+        def poll():
+            polls.append(time.perf_counter())
+            return 0
+
+        with MockWebsocketServer() as server, SlotTracker(server.endpoint, poll) as tracker:
+            while 'slotSubscribe' not in server.subscriptions:
+                time.sleep(0.01)
+
+            server.publish(100)
+            self.assertEqual(100, tracker.wait_for(100, 1))
+            server.publish(101)
+            self.assertEqual(101, tracker.wait_for(101, 1))
+
+        self.assertEqual([], polls, 'Should not poll while subscribed.')
+
+        with MockWebsocketServer() as server, SlotTracker(server.endpoint, poll, 'finalized') as tracker:
+            while 'rootSubscribe' not in server.subscriptions:
+                time.sleep(0.01)
+
+            server.publish(50)
+            self.assertEqual(50, tracker.wait_for(50, 1))
+
+    def test_poll(self):
+        slots = iter(range(10, 1_000))
+
+        # nothing listening on the websocket
+        with SlotTracker('ws://127.0.0.1:1', lambda: next(slots), poll_interval=0.01) as tracker:
+            self.assertGreaterEqual(tracker.wait_for(15, 1), 15, 'Should fall back to polling.')
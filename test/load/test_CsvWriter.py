@@ -0,0 +1,132 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from src.load.CsvWriter import CsvWriter
+from src.load.TransformTask import TransformTask
+from src.transform.Block import Block
+
+
+META = [('a', 'int64'), ('b', 'string')]
+
+
+class TestCsvWriter(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def test_matches_pandas(self):
+        block = Block.open(Path('resources/blocks/110130000/110130000.json.gz'))
+
+        for task in TransformTask:
+            rows, _ = task.transform(block)
+
+            pandas_path = Path(self._output_dir.name, f'{task.name}_pandas.csv')
+            task.to_df(rows).to_csv(str(pandas_path), index=False, header=True)
+            task.to_df(rows).to_csv(str(pandas_path), mode='a', index=False, header=False)
+
+            writer_path = Path(self._output_dir.name, f'{task.name}_writer.csv')
+            with CsvWriter() as writer:
+                writer.write(task.name, writer_path, task.meta, rows)
+                writer.write(task.name, writer_path, task.meta, rows)
+                writer.prepare()
+                writer.commit()
+
+            self.assertEqual(
+                pandas_path.read_text(),
+                writer_path.with_name(f'{task.name}_writer.0.csv').read_text(),
+                f'{task.name} should match pandas.'
+            )
+
+    def _names(self, pattern: str):
+        return sorted(p.name for p in Path(self._output_dir.name).glob(pattern))
+
+    def test_rolling(self):
+        first_path = Path(self._output_dir.name, 'first.csv')
+        second_path = Path(self._output_dir.name, 'second.csv')
+
+        writer = CsvWriter(max_rows=3)
+        writer.write('rows', first_path, META, [[1, 'x']])
+        writer.write('rows', first_path, META, [[2, 'y'], [3, 'z']])
+        writer.write('rows', second_path, META, [[4, 'w']])
+        self.assertEqual([], self._names('*.csv'), 'Parts should only be visible once committed.')
+
+        self.assertEqual(
+            [Path(self._output_dir.name, 'first.0.csv'), Path(self._output_dir.name, 'second.0.csv')],
+            writer.prepare()
+        )
+        writer.commit()
+        self.assertEqual('a,b\n1,x\n2,y\n3,z\n', Path(self._output_dir.name, 'first.0.csv').read_text())
+        self.assertEqual('a,b\n4,w\n', Path(self._output_dir.name, 'second.0.csv').read_text())
+
+        # later rows go to new parts, even from a new writer
+        writer = CsvWriter(max_rows=1, max_file_size=1)
+        writer.write('rows', second_path, META, [[5, 'v']])
+        writer.write('rows', second_path, META, [[6, 'u']])
+        writer.prepare()
+        writer.commit()
+        self.assertEqual(
+            ['first.0.csv', 'second.0.csv', 'second.1.csv', 'second.2.csv'],
+            self._names('*.csv'),
+            'Should roll once over the size threshold.'
+        )
+
+        # closing without committing leaves rows staged to be discarded
+        writer.write('rows', second_path, META, [[7, 't']])
+        writer.close()
+        self.assertEqual(['second.3.csv.inprogress'], self._names('*.inprogress'))
+
+        CsvWriter.discard_staged(Path(self._output_dir.name))
+        self.assertEqual([], self._names('*.inprogress'))
+
+    def test_merge(self):
+        path = Path(self._output_dir.name, 'rows.csv')
+
+        writer = CsvWriter(max_file_size=24)
+        for rows in [[[1, 'x']], [[2, 'y']], [[3, 'z']], [[4, 'w'], [5, 'v'], [6, 'u']]]:
+            writer.write('rows', path, META, rows)
+            writer.prepare()
+            writer.commit()
+
+        files, replaced = writer.prepare_merge([path])
+        self.assertEqual([Path(self._output_dir.name, 'rows.0.csv')], files)
+        self.assertEqual(
+            [Path(self._output_dir.name, 'rows.1.csv'), Path(self._output_dir.name, 'rows.2.csv')],
+            replaced,
+            'Parts should only be merged up to the size threshold.'
+        )
+        self.assertEqual(
+            ['rows.0.csv', 'rows.1.csv', 'rows.2.csv', 'rows.3.csv'],
+            self._names('*.csv'),
+            'Parts should only be replaced once committed.'
+        )
+
+        writer.commit()
+        self.assertEqual(['rows.0.csv', 'rows.3.csv'], self._names('*.csv'))
+        self.assertEqual('a,b\n1,x\n2,y\n3,z\n', Path(self._output_dir.name, 'rows.0.csv').read_text())
+
+        # later rows still go to new parts
+        writer.write('rows', path, META, [[7, 't']])
+        self.assertEqual([Path(self._output_dir.name, 'rows.4.csv')], writer.prepare())
+        writer.commit()
+
+    def test_max_seconds(self):
+        path = Path(self._output_dir.name, 'rows.csv')
+
+        writer = CsvWriter(max_rows=10, max_seconds=0.01)
+        writer.write('rows', path, META, [[1, 'x']])
+        time.sleep(0.02)
+        writer.write('rows', path, META, [[2, 'y']])
+        self.assertEqual(
+            'a,b\n1,x\n2,y\n',
+            Path(self._output_dir.name, 'rows.0.csv.inprogress').read_text(),
+            'Buffered rows should be written once max_seconds has passed.'
+        )
+        self.assertFalse(writer.rolled, 'Writing rows should not roll the part.')
+        writer.close()
@@ -1,9 +1,13 @@
+import gzip
+import json
 import shutil
 from pathlib import Path
 from unittest import TestCase
 
 import pandas
 
+from src.extract.Codec import Codec, Compression
+from src.extract.Segment import Segment
 from src.load.FileOutput import FileOutput, FileOutputFormat
 from src.load.TransformTask import TransformTask
 
@@ -31,6 +35,58 @@ class TestFileOutput(TestCase):
                 True
             )
 
+        self._assert_outputs(destination_path)
+
+    def test_segments(self):
+        # archive the test blocks into segments
+        blocks_path = self._test_destination_path.joinpath('segments')
+        for slot in [110130000, 110360000]:
+            with gzip.open(f'resources/blocks/{slot}/{slot}.json.gz') as f, \
+                    Segment(Segment.path_for(blocks_path, slot, 10_000)) as segment:
+                segment.append(slot, f.read())
+
+        destination_path = self._test_destination_path.joinpath('from_segments')
+        with FileOutput.with_local_cluster(temp_dir='.', blocks_dir=str(blocks_path)) as output:
+            output.write(
+                TransformTask.all(),
+                destination_path,
+                FileOutputFormat.CSV,
+                True
+            )
+
+        self._assert_outputs(destination_path)
+
+    def test_zstd(self):
+        # archive the test blocks as zstd with a dictionary trained on the blocks
+        blocks = {}
+        for slot in [110130000, 110360000]:
+            with gzip.open(f'resources/blocks/{slot}/{slot}.json.gz') as f:
+                blocks[slot] = f.read()
+
+        blocks_path = self._test_destination_path.joinpath('zstd')
+        dictionary_path = self._test_destination_path.joinpath('blocks.dict')
+        transactions = [t for block in blocks.values() for t in json.loads(block)['result']['transactions']]
+        dictionary_path.write_bytes(Codec.train(json.dumps(t).encode('utf-8') for t in transactions))
+
+        codec = Codec(Compression.ZSTD, dictionary_path=dictionary_path)
+        codec.save_dictionary(blocks_path)
+        for slot, block in blocks.items():
+            block_path = blocks_path.joinpath(str(slot), f'{slot}{codec.suffix}')
+            block_path.parent.mkdir()
+            block_path.write_bytes(codec.compress(block))
+
+        destination_path = self._test_destination_path.joinpath('from_zstd')
+        with FileOutput.with_local_cluster(temp_dir='.', blocks_dir=str(blocks_path)) as output:
+            output.write(
+                TransformTask.all(),
+                destination_path,
+                FileOutputFormat.CSV,
+                True
+            )
+
+        self._assert_outputs(destination_path)
+
+    def _assert_outputs(self, destination_path: Path):
         # make sure the outputed files contain the right number of transfers
         expected = [
             [110130000, 394, 3439, 1],
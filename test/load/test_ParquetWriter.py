@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import fastparquet
+
+from src.load.ParquetWriter import ParquetWriter
+from src.load.TransformTask import TransformTask
+from src.transform.Block import Block
+
+META = [('a', 'int64'), ('b', 'string')]
+
+
+class TestParquetWriter(unittest.TestCase):
+
+    _output_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def _parquet_names(self):
+        return sorted(p.name for p in Path(self._output_dir.name).glob('*.parquet'))
+
+    def test_schema(self):
+        block = Block.open(Path('resources/blocks/110130000/110130000.json.gz'))
+
+        with ParquetWriter() as writer:
+            for task in TransformTask:
+                rows, _ = task.transform(block)
+                writer.write(task.name, Path(self._output_dir.name, f'{task.name}.parquet'), task.meta, rows)
+            writer.write('EMPTY', Path(self._output_dir.name, 'EMPTY.parquet'), META, [])
+
+            writer.prepare()
+            writer.commit()
+
+        for task in TransformTask:
+            rows, _ = task.transform(block)
+            parquet = fastparquet.ParquetFile(str(Path(self._output_dir.name, f'{task.name}.0.parquet')))
+
+            self.assertEqual([c[0] for c in task.meta], parquet.columns)
+            self.assertEqual(len(rows), parquet.count())
+
+        empty = fastparquet.ParquetFile(str(Path(self._output_dir.name, 'EMPTY.0.parquet')))
+        self.assertEqual((0, ['a', 'b']), (empty.count(), empty.columns), 'Parts without rows should have a schema.')
+
+    def test_row_groups(self):
+        path = Path(self._output_dir.name, 'rows.parquet')
+
+        with ParquetWriter(max_rows=2) as writer:
+            writer.write('rows', path, META, [[1, 'x']])
+            writer.write('rows', path, META, [[2, 'y']])
+            writer.write('rows', path, META, [[3, None]])
+            writer.prepare()
+            writer.commit()
+
+        parquet = fastparquet.ParquetFile(str(Path(self._output_dir.name, 'rows.0.parquet')))
+        self.assertEqual([2, 1], [row_group.num_rows for row_group in parquet.row_groups if row_group.num_rows > 0])
+        self.assertEqual([1, 2, 3], list(parquet.to_pandas()['a']))
+
+    def test_merge(self):
+        path = Path(self._output_dir.name, 'rows.parquet')
+
+        with ParquetWriter() as writer:
+            for rows in [[[1, 'x']], [], [[2, 'y'], [3, None]]]:
+                writer.write('rows', path, META, rows)
+                writer.prepare()
+                writer.commit()
+            self.assertEqual(['rows.0.parquet', 'rows.1.parquet', 'rows.2.parquet'], self._parquet_names())
+
+            files, replaced = writer.prepare_merge([path])
+            self.assertEqual([Path(self._output_dir.name, 'rows.0.parquet')], files)
+            writer.commit()
+
+        self.assertEqual(['rows.0.parquet'], self._parquet_names())
+        parquet = fastparquet.ParquetFile(str(Path(self._output_dir.name, 'rows.0.parquet')))
+        self.assertEqual(['a', 'b'], parquet.columns)
+        self.assertEqual([1, 2, 3], list(parquet.to_pandas()['a']))
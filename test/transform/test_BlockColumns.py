@@ -0,0 +1,42 @@
+import unittest
+from pathlib import Path
+
+from src.transform.AccountType import AccountType
+from src.transform.BalanceChange import BalanceChangeAgg
+from src.transform.Block import Block
+from src.transform.BlockColumns import BlockColumns
+
+
+class TestBlockColumns(unittest.TestCase):
+
+    _block: Block
+
+    @classmethod
+    def setUpClass(cls):
+        cls._block = Block.open(Path(f'resources/blocks/110130000/110130000.json.gz'))
+
+    def test_transactions(self):
+        columns = self._block.columns
+        transactions = self._block.transactions
+
+        self.assertEqual(len(columns), len(transactions))
+        self.assertEqual(int(columns.successful.sum()), len(transactions.successful))
+        self.assertEqual(int(columns.votes.sum()), len(transactions.votes))
+        self.assertEqual(int(columns.only_fee.sum()), len(transactions.only_fee))
+        self.assertEqual(int((columns.successful & columns.only_fee).sum()), len(transactions.successful.only_fee))
+        self.assertEqual(int(columns.fee[columns.successful].sum()), transactions.successful.fees)
+
+    def test_balance_changes(self):
+        for agg in BalanceChangeAgg:
+            self.assertEqual(
+                list(self._block.columns.balance_changes(agg)),
+                [t.total_account_balance_change(agg).v for t in self._block.transactions],
+                f'Balance changes should match transactions for {agg}.'
+            )
+
+    def test_empty(self):
+        columns = BlockColumns([])
+
+        self.assertEqual(len(columns), 0)
+        self.assertEqual(len(columns.only_fee), 0)
+        self.assertEqual({t: len(mask) for t, mask in columns.account_types.items()}, {t: 0 for t in AccountType})
@@ -0,0 +1,54 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from src.transform.AccountType import AccountType
+from src.transform.BalanceChange import BalanceChangeAgg
+from src.transform.Block import Block
+from src.transform.BlockColumns import BlockColumns
+from src.transform.BlockMetrics import BlockMetrics
+from src.transform.Transactions import Transactions
+
+
+class TestBlockMetrics(unittest.TestCase):
+
+    _block: Block
+
+    @classmethod
+    def setUpClass(cls):
+        cls._block = Block.open(Path(f'resources/blocks/110130000/110130000.json.gz'))
+
+    def _assert_metrics(self, metrics: BlockMetrics, transactions: Transactions):
+        accounts_by_type = transactions.accounts_by_type
+        self.assertEqual(metrics, BlockMetrics(
+            len(transactions),
+            len(transactions.votes),
+            len(transactions.more_than_fee),
+            len(transactions.only_fee),
+            transactions.fees,
+            transactions.balance_change(BalanceChangeAgg.OUT).v,
+            len(accounts_by_type.get(AccountType.PROGRAM, [])),
+            len(accounts_by_type.get(AccountType.COIN, [])),
+            len(accounts_by_type.get(AccountType.TOKEN, []))
+        ))
+
+    def test_by_success(self):
+        successful, errors = BlockMetrics.by_success(self._block.columns)
+
+        self._assert_metrics(successful, self._block.transactions.successful)
+        self._assert_metrics(errors, self._block.transactions.errors)
+
+    def test_group_by(self):
+        # any grouping of transactions, here votes from everything else with an empty group in between
+        columns = self._block.columns
+        metrics = BlockMetrics.group_by(columns, np.where(columns.votes, 0, 2), 3)
+
+        self._assert_metrics(metrics[0], self._block.transactions.votes)
+        self._assert_metrics(metrics[1], Transactions([]))
+        self._assert_metrics(
+            metrics[2], self._block.transactions.filter(lambda t: not t.has_instruction_of('vote'))
+        )
+
+    def test_empty(self):
+        self.assertEqual(BlockMetrics.by_success(BlockColumns([])), [BlockMetrics(0, 0, 0, 0, 0, 0, 0, 0, 0)] * 2)
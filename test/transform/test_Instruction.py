@@ -1,6 +1,8 @@
 import unittest
 from pathlib import Path
 
+from src.transform.Account import Account
+from src.transform.Instruction import Instructions, PartiallyParsedInstruction
 from src.transform.ProgramInstruction import ProgramInstruction
 from src.transform.Block import Block
 from src.transform.Transaction import Transaction
@@ -55,6 +57,29 @@ class TestInstruction(unittest.TestCase):
             ))
         )
 
+    def test_walk(self):
+        instructions = self._interesting_transaction.instructions
+
+        self.assertEqual(
+            [instruction.gen_id for instruction in instructions.flatten()],
+            [instruction.gen_id for instruction in instructions.walk()],
+            'Walk should be in the same order as flatten.'
+        )
+        self.assertEqual(
+            [instruction.gen_id for instruction in next(iter(instructions)).walk()],
+            [instruction.gen_id for instruction in next(iter(instructions)).flatten()]
+        )
+
+        # deeper than the recursion limit
+        program = Account(0, 'program')
+        instruction = PartiallyParsedInstruction(set(), program, None, '0')
+        for depth in range(1, 5_000):
+            instruction = PartiallyParsedInstruction(set(), program, Instructions([instruction]), str(depth))
+
+        flattened = Instructions([instruction]).flatten()
+        self.assertEqual(5_000, len(flattened))
+        self.assertEqual([str(depth) for depth in reversed(range(5_000))], [i.data for i in flattened])
+
     def test_filter(self):
         self.assertEqual(
             [
@@ -88,3 +113,34 @@ class TestInstruction(unittest.TestCase):
             list(map(lambda instruction: instruction.gen_id, filtered.flatten()))
         )
         self.assertEqual(4, len(filtered))
+
+    def test_index(self):
+        instructions = self._interesting_transaction.instructions
+        self.assertIsNotNone(instructions._index, 'Index should be built while parsing instructions.')
+        flattened = instructions.flatten()
+
+        for program_instruction in ProgramInstruction:
+            found = instructions.index.get(program_instruction.program_name, program_instruction.instruction_type)
+            self.assertEqual(
+                [i.gen_id for i in flattened if program_instruction.of(i)],
+                [i.gen_id for i in found],
+                f'Index should match filtering flattened instructions for {program_instruction}.'
+            )
+            self.assertEqual(len(found) > 0, program_instruction.within(instructions))
+            self.assertEqual(
+                any(program_instruction.of(i) for i in instructions),
+                instructions.index.has(program_instruction.program_name, program_instruction.instruction_type, True),
+                f'Outer instructions should match for {program_instruction}.'
+            )
+
+        # instructions are looked up as is rather than copied
+        transfers = instructions.index.get('system', 'transfer')
+        self.assertEqual(
+            list(map(id, transfers)),
+            list(map(id, ProgramInstruction.SYSTEM_TRANSFER.filter(instructions, True)))
+        )
+        originals = {id(i) for outer in instructions for i in [outer, *outer.inner_instructions]}
+        self.assertTrue(all(id(i) in originals for i in transfers))
+
+        self.assertFalse(instructions.index.has('vote'))
+        self.assertEqual(0, len(ProgramInstruction.SPL_TRANSFER.filter(instructions)))
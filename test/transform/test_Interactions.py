@@ -2,7 +2,9 @@ import unittest
 from pathlib import Path
 
 from src.transform.Block import Block
+from src.transform.InteractionExtractor import InteractionExtractor
 from src.transform.Interactions import Interactions
+from src.transform.ProgramInstruction import ProgramInstruction
 from src.transform.Transfer import CoinTransfer, TokenTransfer
 
 
@@ -18,3 +20,33 @@ class TestInteractions(unittest.TestCase):
         # make sure we get the right number of transfers for each
         self.assertEqual(321, len(transfers_by_type[CoinTransfer]))
         self.assertEqual(73, len(transfers_by_type[TokenTransfer]))
+
+    def test_extractor(self):
+        # handlers for a whole program get every instruction of the program alongside handlers for specific types
+        extractor = InteractionExtractor() \
+            .register(ProgramInstruction.SYSTEM, lambda transaction, instruction: ('system', instruction.gen_id)) \
+            .register(
+                ProgramInstruction.SYSTEM_CREATE_ACCOUNT,
+                lambda transaction, instruction: ('createAccount', instruction.gen_id)
+            )
+
+        expected = []
+        for transaction in self._block.transactions.successful:
+            for instruction in transaction.instructions.walk():
+                if ProgramInstruction.SYSTEM.of(instruction):
+                    expected.append(('system', instruction.gen_id))
+                if ProgramInstruction.SYSTEM_CREATE_ACCOUNT.of(instruction):
+                    expected.append(('createAccount', instruction.gen_id))
+
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(expected, list(Interactions([self._block], extractor)))
+
+    def test_iterate_twice(self):
+        # blocks from a one shot iterator should still be there the second time around
+        interactions = Interactions(iter([self._block]))
+        self.assertGreater(len(list(interactions)), 0)
+        self.assertEqual(list(interactions), list(interactions))
+        self.assertEqual(
+            {t: len(i) for t, i in Interactions([self._block]).by_type().items()},
+            {t: len(i) for t, i in interactions.by_type().items()}
+        )
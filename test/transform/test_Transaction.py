@@ -234,3 +234,24 @@ class TestTransaction(unittest.TestCase):
             len(self._transaction_with_tokens.accounts),
             count(self._transaction_with_tokens.accounts_by_type())
         )
+
+    def test_lazy(self):
+        block = Block.open(Path(f'resources/blocks/110130000/110130000.json.gz'))
+
+        for transaction in block.transactions:
+            transaction.total_account_balance_change()
+            transaction.has_instruction_of('vote')
+            self.assertNotIn('accounts', transaction.__dict__, 'Balances and votes should not need accounts.')
+            self.assertNotIn('instructions', transaction.__dict__, 'Votes should not need parsed instructions.')
+
+        for transaction in block.transactions:
+            self.assertEqual(
+                reduce(lambda a, b: a + b, map(lambda c: c.change, transaction.account_balance_changes.values())),
+                transaction.total_account_balance_change()
+            )
+            self.assertEqual(
+                any(instruction.is_of('vote', None) for instruction in transaction.instructions),
+                transaction.has_instruction_of('vote')
+            )
+            self.assertEqual(transaction.instructions.programs, transaction.program_accounts)
+            self.assertEqual(set(transaction.token_balance_changes.keys()), transaction.token_accounts)